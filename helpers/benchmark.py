@@ -0,0 +1,265 @@
+import argparse
+import atexit
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+sys.path.insert(0, BASE_DIR)
+
+BASELINE_PATH = os.path.join(BASE_DIR, "..", "data", "benchmark_baseline.json")
+
+# name -> setup function returning the callable to time and how many operations one call does
+BENCHMARKS = {}
+
+
+def benchmark(name, number=1):
+    """Register a setup function under `name`. `number` is calls per timed repeat."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+
+# ------------- MICRO -------------
+
+@benchmark("shoe.deal", number=20000)
+def bench_shoe_deal():
+    from shoe import Shoe
+    shoe = Shoe(8, rng=0)
+
+    def run():
+        if shoe.needs_reshuffle():
+            shoe.reshuffle()
+        shoe.deal()
+    return run
+
+
+@benchmark("shoe.reshuffle", number=50)
+def bench_shoe_reshuffle():
+    from shoe import Shoe
+    return Shoe(8, rng=0).reshuffle
+
+
+@benchmark("array_shoe.deal", number=20000)
+def bench_array_shoe_deal():
+    from shoe import ArrayShoe
+    shoe = ArrayShoe(8, rng=0)
+
+    def run():
+        if shoe.needs_reshuffle():
+            shoe.reshuffle()
+        shoe.deal()
+    return run
+
+
+@benchmark("array_shoe.reshuffle", number=200)
+def bench_array_shoe_reshuffle():
+    from shoe import ArrayShoe
+    return ArrayShoe(8, rng=0).reshuffle
+
+
+def _random_hands(count=1000, seed=1):
+    from shoe import Shoe
+    rng = random.Random(seed)
+    deck = Shoe(1).cards
+    hands = [rng.sample(deck, rng.choice((2, 2, 2, 3, 4))) for _ in range(count)]
+    upcards = [rng.choice(deck) for _ in range(count)]
+    counts = [rng.uniform(-6, 8) for _ in range(count)]
+    return hands, upcards, counts
+
+
+@benchmark("hand_value", number=1000)
+def bench_hand_value():
+    from blackjack import hand_value
+    hands, _, _ = _random_hands()
+    return lambda cycle=itertools.cycle(hands): hand_value(next(cycle))
+
+
+def _strategy_bench(call):
+    cycle = itertools.cycle(zip(*_random_hands()))
+    return lambda: call(*next(cycle))
+
+
+@benchmark("strategy.best_move", number=1000)
+def bench_best_move():
+    from strategy import best_move
+    return _strategy_bench(lambda hand, up, tc: best_move(hand, up, tc))
+
+
+@benchmark("strategy.check_playing_deviations", number=1000)
+def bench_check_playing_deviations():
+    from strategy import check_playing_deviations
+    return _strategy_bench(check_playing_deviations)
+
+
+@benchmark("strategy.best_move_hard", number=1000)
+def bench_best_move_hard():
+    from strategy import best_move_hard
+    return _strategy_bench(lambda hand, up, tc: best_move_hard(hand, up))
+
+
+@benchmark("strategy.best_move_soft", number=1000)
+def bench_best_move_soft():
+    from strategy import best_move_soft
+    return _strategy_bench(lambda hand, up, tc: best_move_soft(hand, up))
+
+
+@benchmark("strategy.should_split", number=1000)
+def bench_should_split():
+    from strategy import should_split
+    return _strategy_bench(lambda hand, up, tc: should_split(hand[:1] * 2, up))
+
+
+@benchmark("strategy.should_double_down", number=1000)
+def bench_should_double_down():
+    from strategy import should_double_down
+    return _strategy_bench(lambda hand, up, tc: should_double_down(hand, up))
+
+
+# ------------- MACRO -------------
+
+@benchmark("game.round", number=2000)
+def bench_game_round():
+    from blackjack import BlackjackGame
+    from shoe import ArrayShoe
+    from simulator import play_round
+    game = BlackjackGame(starting_balance=10 ** 15, min_bet=10, max_bet=10, shoe=ArrayShoe(8, rng=0))
+    return lambda: play_round(game, 10)
+
+
+@benchmark("game.round (list shoe)", number=2000)
+def bench_game_round_list_shoe():
+    from blackjack import BlackjackGame
+    from shoe import Shoe
+    from simulator import play_round
+    game = BlackjackGame(starting_balance=10 ** 15, min_bet=10, max_bet=10, shoe=Shoe(8, rng=0))
+    return lambda: play_round(game, 10)
+
+
+@benchmark("game.snapshot+restore", number=10000)
+def bench_game_snapshot():
+    from blackjack import BlackjackGame
+    from counting import CardCounter
+    from shoe import ArrayShoe
+    game = BlackjackGame(starting_balance=10 ** 15, min_bet=10, max_bet=10,
+                         shoe=ArrayShoe(8, counter=CardCounter(), rng=0))
+    game.start_round(10)
+    return lambda: game.restore(game.snapshot())
+
+
+@benchmark("calc_house_edge (cold, 2 decks)")
+def bench_house_edge_cold():
+    from ev import house_edge
+    return lambda: house_edge({}, 2)
+
+
+@benchmark("calc_house_edge (cached)", number=10000)
+def bench_house_edge_cached():
+    from house_edge import calc_house_edge
+    calc_house_edge({}, 2)
+    return lambda: calc_house_edge({}, 2)
+
+
+@benchmark("trainer.update_ui", number=200)
+def bench_update_ui():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    import card_atlas
+    from main import BlackjackWindow
+    app = QApplication.instance() or QApplication([])
+    # Atlases built for the run go to a scratch dir, and no hand history is kept
+    scratch = tempfile.TemporaryDirectory()
+    card_atlas.ATLAS_DIR = scratch.name
+    window = BlackjackWindow(history_path=None)
+    # Time the window with its atlas, and don't leave the builder running at exit
+    if window.atlas_builder is not None:
+        window.atlas_builder.wait()
+        app.processEvents()
+    bench_update_ui.keep = (app, window, scratch)
+    # Closing stops the window's worker threads before the interpreter exits
+    atexit.register(window.close)
+
+    def run():
+        if not window.game.in_progress:
+            window.game.reset_round()
+            window.game.start_round(window.game.min_bet)
+        window.update_ui()
+        app.processEvents()
+    return run
+
+
+# ------------- RUNNER -------------
+
+def run_benchmarks(names=None, repeat=5):
+    """Time each benchmark. Returns {name: best seconds per operation}."""
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if names and not any(n in name for n in names):
+            continue
+        run = setup()
+        run()  # warm up caches and lazy imports
+        times = timeit.repeat(run, number=number, repeat=repeat)
+        results[name] = min(times) / number
+    return results
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(results, baseline, threshold):
+    """Print each result against the baseline. Returns the names that got slower than `threshold`."""
+    regressions = []
+    for name, seconds in results.items():
+        line = f"{name:<36} {format_time(seconds):>10}"
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            line += f"   {ratio:5.2f}x baseline"
+            if ratio > 1 + threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the game core, strategy and trainer UI")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown over the baseline reported as a regression (0.10 = 10%%)")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        sys.exit(0)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = run_benchmarks(args.names, args.repeat)
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": baseline}, f, indent=1, sort_keys=True)
+        print(f"Saved baseline -> {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
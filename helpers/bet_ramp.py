@@ -0,0 +1,153 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from counting import SYSTEMS, TRUE_COUNT_METHODS
+from simulator import outcomes_by_true_count
+from ror_calc import risk_of_ruin
+
+# Where the trainer looks for a suggested ramp
+RAMP_PATH = os.path.join(BASE_DIR, "..", "data", "bet_ramp.json")
+
+
+def true_count_stats(tallies):
+    """
+    Per true count bucket (frequency, EV, second moment) of one unit bet,
+    from outcomes_by_true_count tallies.
+    """
+    total = sum(sum(counts.values()) for counts in tallies.values())
+    stats = {}
+    for true_count, counts in sorted(tallies.items()):
+        n = sum(counts.values())
+        ev = sum(net * c for net, c in counts.items()) / n
+        second = sum(net * net * c for net, c in counts.items()) / n
+        stats[true_count] = (n / total, ev, second)
+    return stats
+
+
+def ramp_moments(stats, ramp):
+    """Per-hand mean and standard deviation of a {true count: bet} ramp."""
+    mean = second = 0.0
+    for true_count, (freq, ev, m2) in stats.items():
+        bet = ramp[true_count]
+        mean += freq * bet * ev
+        second += freq * bet * bet * m2
+    return mean, math.sqrt(max(second - mean * mean, 0.0))
+
+
+def ramp_ror(stats, ramp, bankroll):
+    mean, stddev = ramp_moments(stats, ramp)
+    if mean <= 0:
+        return 1.0
+    return min(risk_of_ruin(bankroll, mean, stddev), 1.0)
+
+
+def kelly_fractions(stats):
+    """
+    Kelly fraction, EV / variance, per bucket. The sparse high counts are
+    noisy, so fractions are pooled across neighbouring buckets (weighted
+    by frequency) until they never fall as the count rises.
+    """
+    blocks = []  # [fraction, weight, bucket count]
+    for freq, ev, m2 in stats.values():
+        variance = m2 - ev * ev
+        blocks.append([ev / variance if variance > 0 else 0.0, freq, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            value, weight, size = blocks.pop()
+            prev = blocks[-1]
+            prev[0] = (prev[0] * prev[1] + value * weight) / (prev[1] + weight)
+            prev[1] += weight
+            prev[2] += size
+    fractions = []
+    for value, _, size in blocks:
+        fractions.extend([value] * size)
+    return dict(zip(stats, fractions))
+
+
+def kelly_ramp(stats, scale, min_bet, max_bet, step=1, fractions=None):
+    """
+    Bets proportional to each bucket's Kelly fraction times `scale`,
+    rounded to `step` and clamped to the table limits. Buckets with no edge
+    bet the table minimum.
+    """
+    if fractions is None:
+        fractions = kelly_fractions(stats)
+    ramp = {}
+    for true_count, fraction in fractions.items():
+        bet = round(scale * max(fraction, 0.0) / step) * step
+        ramp[true_count] = min(max(bet, min_bet), max_bet)
+    return ramp
+
+
+def optimize_ramp(stats, bankroll, min_bet, max_bet, target_ror=0.05, step=1):
+    """
+    Largest Kelly-proportional ramp whose risk of ruin stays at or under
+    `target_ror`. Every candidate is scored from the same per-bucket stats,
+    so nothing is simulated again. Returns (ramp, mean, stddev, ror).
+    """
+    fractions = kelly_fractions(stats)
+
+    def ror_at(scale):
+        return ramp_ror(stats, kelly_ramp(stats, scale, min_bet, max_bet, step, fractions), bankroll)
+
+    # Past this scale every positive bucket is already at the table max
+    positive = [f for f in fractions.values() if f > 0]
+    lo, hi = 0.0, max_bet / min(positive) if positive else 0.0
+    if ror_at(hi) <= target_ror:
+        lo = hi
+    else:
+        for _ in range(60):
+            mid = (lo + hi) / 2
+            if ror_at(mid) <= target_ror:
+                lo = mid
+            else:
+                hi = mid
+    ramp = kelly_ramp(stats, lo, min_bet, max_bet, step, fractions)
+    mean, stddev = ramp_moments(stats, ramp)
+    return ramp, mean, stddev, ramp_ror(stats, ramp, bankroll)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimal Kelly-proportional bet ramp for a target risk of ruin")
+    parser.add_argument("--bankroll", type=float, default=10000)
+    parser.add_argument("--min-bet", type=float, default=10)
+    parser.add_argument("--max-bet", type=float, default=1000)
+    parser.add_argument("--step", type=float, default=5, help="bets are rounded to this chip size")
+    parser.add_argument("--ror", type=float, default=0.05, help="target risk of ruin")
+    parser.add_argument("--rounds", type=int, default=2000000, help="rounds simulated for the per-count stats")
+    parser.add_argument("--decks", type=int, default=8)
+    parser.add_argument("--penetration", type=float, default=0.8)
+    parser.add_argument("--system", default="Hi-Lo", choices=sorted(SYSTEMS))
+    parser.add_argument("--true-count", default="exact", choices=sorted(TRUE_COUNT_METHODS))
+    parser.add_argument("--rules", default="{}", help='JSON rule overrides, e.g. \'{"H17": false}\'')
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--save", nargs="?", const=RAMP_PATH, default=None,
+                        help=f"write the ramp for the trainer (default path {RAMP_PATH})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tallies = outcomes_by_true_count(args.rounds, num_decks=args.decks, reshuffle_pct=args.penetration,
+                                     rules=json.loads(args.rules), system=args.system,
+                                     method=args.true_count, seed=args.seed)
+    stats = true_count_stats(tallies)
+    print(f"Simulated {args.rounds} rounds in {time.perf_counter() - start:.1f}s")
+
+    ramp, mean, stddev, ror = optimize_ramp(stats, args.bankroll, args.min_bet, args.max_bet,
+                                            args.ror, args.step)
+    print(f"{'TC':>4} {'freq':>7} {'EV':>8} {'SD':>6} {'bet':>8}")
+    for true_count, (freq, ev, m2) in stats.items():
+        print(f"{true_count:>4} {freq:7.2%} {ev:+8.4f} {math.sqrt(m2 - ev * ev):6.3f} {ramp[true_count]:8.0f}")
+    print(f"EV {mean:+.2f} per hand, SD {stddev:.2f} per hand, risk of ruin {ror:.2%}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"system": args.system, "bankroll": args.bankroll, "ror": ror,
+                       "ramp": {str(tc): bet for tc, bet in ramp.items()}}, f, indent=1)
+        print(f"Saved ramp -> {args.save}")
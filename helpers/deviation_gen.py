@@ -0,0 +1,318 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from basic_strategy import chart_name, computed_chart, full_rules
+from blackjack import BlackjackGame
+from counting import CardCounter, SYSTEMS, TRUE_COUNT_METHODS
+from rng import ShuffleStream
+from shoe import ArrayShoe, CARD_RANK
+from simulator import play_hands
+from strategy import DEVIATION_SETS, DEVIATIONS_DIR, PAIR, best_move
+
+# True counts past these are lumped into the end buckets
+MIN_TC, MAX_TC = -10, 10
+# Cards kept back at the end of the shoe so a sampled hand never runs out
+RESERVE = 24
+BANKROLL = 10 ** 9
+TEN = 9  # rank index of ten-valued cards
+
+MOVES = {
+    "Hit": BlackjackGame.player_hit,
+    "Stand": BlackjackGame.player_stand,
+    "Double": BlackjackGame.player_double,
+    "Split": BlackjackGame.player_split,
+    "Surrender": BlackjackGame.player_surrender,
+}
+
+
+def hand_cards(hand):
+    """Card values (Ace=1) of the two-card hand standing in for a deviation hand."""
+    if isinstance(hand, str):
+        value = 1 if hand[4:] == "A" else int(hand[4:])
+        return value, value
+    if hand >= 12:
+        return 10, hand - 10
+    # Two different cards closest to half the total each
+    high = hand // 2 + 1
+    return high, hand - high
+
+
+def _code(value):
+    return "A" if value == 1 else "T" if value == 10 else str(value)
+
+
+def candidates(sets=None, rules=None, num_decks=8):
+    """
+    Decisions to find indices for: every playing deviation and insurance
+    rule in the named deviation sets (default all), as (hand, upcard,
+    basic strategy move, alternative move). Where a rule's move is already
+    basic strategy for these rules, like I18's "stand on 12 v 4 at 0 or
+    more", the alternative is the move it competes with, so the index comes
+    out as the other side of the same crossover. Moves the rules don't
+    allow are dropped.
+    """
+    rules = full_rules(rules)
+    chart = computed_chart(rules, num_decks)
+    found = {}
+    for name in sets or sorted(DEVIATION_SETS):
+        deviation_set = DEVIATION_SETS[name]
+        if deviation_set["insurance"]:
+            found[("insurance", 1)] = ("insurance", 1, "No insurance", "Insurance")
+        for key, upcard, _, move, _ in deviation_set["rules"]:
+            state, total = key
+            hand = ("pairA" if total == 2 else f"pair{total // 2}") if state == PAIR else total
+            cards = [_code(v) + "S" for v in hand_cards(hand)]
+            if move == "Surrender" and not rules['LS']:
+                continue
+            game = BlackjackGame(rules=rules)
+            game.start_round(game.min_bet, cards, [_code(upcard) + "S", "2S"])
+            hand_obj = game.get_current_hand()
+            if move == "Double" and not game.can_double(hand_obj):
+                continue
+            allowed = {"can_double": game.can_double(hand_obj), "can_split": game.can_split(hand_obj),
+                       "can_surrender": game.can_surrender(hand_obj)}
+            base, _ = best_move(cards, _code(upcard), None, chart=chart, **allowed)
+            if base == move:
+                move = _competitor(cards, upcard, move, allowed, chart)
+            found[(hand, upcard, move)] = (hand, upcard, base, move)
+    return list(found.values())
+
+
+def _competitor(cards, upcard, move, allowed, chart):
+    """Next best move to `move`: the other of hit and stand, or what basic strategy plays without it."""
+    if move in ("Hit", "Stand"):
+        return "Stand" if move == "Hit" else "Hit"
+    flag = {"Double": "can_double", "Split": "can_split", "Surrender": "can_surrender"}[move]
+    return best_move(cards, _code(upcard), None, chart=chart, **dict(allowed, **{flag: False}))[0]
+
+
+def _swap_in(buffer, index, sampler, rank=None, exclude=None):
+    """
+    Swap an undealt card of `rank` (or any card not of rank `exclude`),
+    picked uniformly, into buffer[index]. Returns the swapped position, or
+    None if there is none. Taking the first match instead would leave a run
+    of non-matching cards right where the next hits come from.
+    """
+    def wanted(j):
+        card_rank = CARD_RANK[buffer[j]]
+        return card_rank == rank if rank is not None else card_rank != exclude
+
+    n = len(buffer)
+    for _ in range(64):
+        j = sampler.randrange(index, n)
+        if wanted(j):
+            break
+    else:
+        matches = [j for j in range(index, n) if wanted(j)]
+        if not matches:
+            return None
+        j = sampler.choice(matches)
+    buffer[index], buffer[j] = buffer[j], buffer[index]
+    return j
+
+
+def _play(game, cards, dealer, move, chart):
+    """Net result of one bet when the first decision is `move` and the rest is basic strategy."""
+    game.balance = BANKROLL
+    game.start_round(1, cards, dealer)
+    if game.in_progress:
+        MOVES[move](game)
+        if game.get_current_hand().finished:
+            game.advance_hand()
+        play_hands(game, use_deviations=False, chart=chart)
+        game.play_dealer()
+        game.settle_bets()
+    return game.balance - BANKROLL
+
+
+def run_shoes(task):
+    """
+    Worker: play `shoes` shoes from `stream`. At every `step` cards into
+    each shoe, every candidate decision is dealt from the same undealt
+    cards and played both ways, so all candidates share each shoe.
+    Returns per candidate {true count bucket: [hands, sum, sum of squares]}
+    of the alternative move's gain over the basic strategy move.
+    """
+    cands, rules, num_decks, penetration, system, method, shoes, step, stream = task
+    chart = computed_chart(rules, num_decks)
+    counter = CardCounter([system], num_decks, method) if system != "Hi-Lo" else None
+    # The shoe is never cut mid-hand; penetration bounds where decisions are sampled
+    shoe = ArrayShoe(num_decks, 1.0, counter=counter, true_count_method=method, rng=stream)
+    game = BlackjackGame(BANKROLL, 1, 1, shoe=shoe, rules=rules)
+    sampler = random.Random(repr(stream.state()))
+    last = min(int(penetration * len(shoe.buffer)), len(shoe.buffer) - RESERVE)
+    tallies = [{} for _ in cands]
+
+    def true_count():
+        if counter is None:
+            return shoe.get_true_count()
+        return counter.true_count(shoe.cards_left(), system)
+
+    def add(i, tc, gain):
+        bucket = min(max(math.floor(tc), MIN_TC), MAX_TC)
+        tally = tallies[i].setdefault(bucket, [0, 0.0, 0.0])
+        tally[0] += 1
+        tally[1] += gain
+        tally[2] += gain * gain
+
+    buffer = shoe.buffer
+    for _ in range(shoes):
+        shoe.reshuffle()
+        # A random start keeps the sampled depths from lining up across shoes
+        shoe.deal_many(sampler.randrange(step))
+        while shoe.pos < last:
+            start = shoe.snapshot()
+            pos = shoe.pos
+            for i, (hand, upcard, base, alt) in enumerate(cands):
+                swaps = []
+                if hand == "insurance":
+                    swaps.append((pos, _swap_in(buffer, pos, sampler, 0)))
+                    if swaps[0][1] is not None:
+                        shoe.deal()
+                        # Exact: an insurance bet wins 2 when the hole card is a ten and loses 1 otherwise
+                        add(i, true_count(), 3 * shoe.rank_counts[TEN] / shoe.cards_left() - 1)
+                else:
+                    p1, p2 = hand_cards(hand)
+                    # No dealer blackjack: the dealer peeks before the player acts
+                    exclude = TEN if upcard == 1 else 0 if upcard == 10 else None
+                    for offset, rank in enumerate((p1 - 1, upcard - 1, p2 - 1)):
+                        swaps.append((pos + offset, _swap_in(buffer, pos + offset, sampler, rank)))
+                    if exclude is not None:
+                        swaps.append((pos + 3, _swap_in(buffer, pos + 3, sampler, exclude=exclude)))
+                    if all(j is not None for _, j in swaps):
+                        first, up, second = shoe.deal_many(3)
+                        tc = true_count()
+                        hole = shoe.deal()
+                        dealt = shoe.snapshot()
+                        base_net = _play(game, [first, second], [up, hole], base, chart)
+                        shoe.restore(dealt)
+                        alt_net = _play(game, [first, second], [up, hole], alt, chart)
+                        add(i, tc, alt_net - base_net)
+                shoe.restore(start)
+                for index, j in reversed(swaps):
+                    if j is not None:
+                        buffer[index], buffer[j] = buffer[j], buffer[index]
+            shoe.deal_many(step)
+    return tallies
+
+
+def merge(results):
+    merged = [{} for _ in results[0]]
+    for tallies in results:
+        for total, tally in zip(merged, tallies):
+            for bucket, (n, s, ss) in tally.items():
+                into = total.setdefault(bucket, [0, 0.0, 0.0])
+                into[0] += n
+                into[1] += s
+                into[2] += ss
+    return merged
+
+
+def _fit(tally, lo, hi):
+    """
+    Least squares line through the bucket means in [lo, hi], each weighted
+    by the inverse variance of its mean: (intercept, slope) or None.
+    """
+    sw = sx = sy = sxx = sxy = 0.0
+    for bucket, (n, s, ss) in tally.items():
+        if lo <= bucket <= hi and MIN_TC < bucket < MAX_TC and n > 1:
+            x = bucket + 0.5  # bucket middle
+            mean = s / n
+            w = n / max(ss / n - mean * mean, 1e-9)
+            sw += w
+            sx += w * x
+            sy += w * mean
+            sxx += w * x * x
+            sxy += w * x * mean
+    det = sw * sxx - sx * sx
+    if det <= 0:
+        return None
+    slope = (sw * sxy - sx * sy) / det
+    return (sy - slope * sx) / sw, slope
+
+
+def find_index(tally, window=4):
+    """
+    Crossover of the alternative move's gain over basic strategy: a line is
+    fitted to the per-count gains, then refitted within `window` of where it
+    crosses zero. Returns (true count, sense) with sense ">=" when the
+    alternative wins at higher counts, or None if the lines never cross in range.
+    """
+    fit = _fit(tally, MIN_TC, MAX_TC)
+    if fit is None or fit[1] == 0:
+        return None
+    crossing = -fit[0] / fit[1]
+    local = _fit(tally, math.floor(crossing) - window, math.floor(crossing) + window)
+    if local is not None and local[1] != 0 and (local[1] > 0) == (fit[1] > 0):
+        crossing = -local[0] / local[1]
+    if not MIN_TC <= crossing <= MAX_TC:
+        return None
+    return crossing, ">=" if fit[1] > 0 else "<="
+
+
+def generate(cands, rules=None, num_decks=8, penetration=0.8, system="Hi-Lo", method="exact", shoes=1000,
+             step=8, seed=0, workers=None, tasks=None):
+    """Simulate every candidate across a process pool. Returns the merged tallies, one per candidate."""
+    rules = full_rules(rules)
+    # Generate or load the chart once here, so the workers only read the cache
+    computed_chart(rules, num_decks)
+    tasks = tasks or max(4 * (workers or os.cpu_count() or 1), 1)
+    streams = ShuffleStream(seed).spawn(tasks)
+    per_task = [shoes // tasks + (i < shoes % tasks) for i in range(tasks)]
+    work = [(cands, rules, num_decks, penetration, system, method, n, step, stream)
+            for n, stream in zip(per_task, streams) if n]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge(list(pool.map(run_shoes, work, chunksize=1)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive playing deviation indices by simulation")
+    parser.add_argument("--shoes", type=int, default=2000)
+    parser.add_argument("--step", type=int, default=8, help="cards between sampled decisions in a shoe")
+    parser.add_argument("--decks", type=int, default=8)
+    parser.add_argument("--penetration", type=float, default=0.8)
+    parser.add_argument("--rules", default="{}", help='JSON rule overrides, e.g. \'{"H17": false}\'')
+    parser.add_argument("--system", default="Hi-Lo", choices=sorted(SYSTEMS))
+    parser.add_argument("--true-count", default="exact", choices=sorted(TRUE_COUNT_METHODS))
+    parser.add_argument("--sets", nargs="*", default=None, help="deviation sets to take the decisions from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per core")
+    parser.add_argument("--output", default=None, help=f"deviation set file to write, e.g. in {DEVIATIONS_DIR}")
+    args = parser.parse_args()
+
+    rules = full_rules(json.loads(args.rules))
+    cands = candidates(args.sets, rules, args.decks)
+    start = time.perf_counter()
+    tallies = generate(cands, rules, args.decks, args.penetration, args.system, args.true_count, args.shoes,
+                       args.step, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    samples = sum(n for tally in tallies for n, _, _ in tally.values())
+    print(f"{len(cands)} decisions, {samples:,} hands in {elapsed:.1f}s")
+
+    deviations = []
+    print(f"{'hand':>9} {'up':>3}  {'basic':<12} {'alternative':<10} {'index':>8} {'hands':>10}")
+    for (hand, upcard, base, alt), tally in zip(cands, tallies):
+        found = find_index(tally)
+        hands = sum(n for n, _, _ in tally.values())
+        shown = f"{found[1]}{found[0]:+.1f}" if found else "none"
+        print(f"{hand!s:>9} {_code(upcard):>3}  {base:<12} {alt:<10} {shown:>8} {hands:>10,}")
+        if found:
+            deviations.append([hand, "A" if upcard == 1 else upcard, round(found[0]), alt, found[1]])
+
+    if args.output:
+        name = f"Generated {args.system} {chart_name(rules, args.decks)}"
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"name": name, "system": args.system,
+                       "description": f"Simulated from {args.shoes} shoes, seed {args.seed}.",
+                       "deviations": deviations}, f, indent=1)
+        print(f"Saved {len(deviations)} indices as {name!r} -> {args.output}")
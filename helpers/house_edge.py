@@ -1,41 +1,86 @@
+import os
 import sys
+import threading
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QRadioButton, QButtonGroup,
     QGroupBox, QGridLayout, QFrame
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
 
-# Rule adjustments per Stanford Wong's chart
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from ev import house_edge
+from house_edge_sweep import load_results
+
+_edge_cache = {}
+
+# How the game house_edge_sweep.py simulates differs from the exact edge's rules
+SIM_MODEL = ("Simulated by house_edge_sweep.py playing the trainer's game: the dealer doesn't peek\n"
+             "for blackjack, split aces can be hit, and play follows the hand-typed chart.\n"
+             "It is a different rule model from the exact edge above, not a check on it.")
+
+# Computed by combinatorial analysis, see src/ev.py
 def calc_house_edge(rules, decks):
-    edge = 0.0
-    # Decks
-    deck_vals = {1: 0.00, 2: 0.32, 4: 0.47, 6: 0.52, 8: 0.55}
-    edge += deck_vals[decks]
-    # H17
-    if rules['H17']:
-        edge += 0.20
-    # DAS
-    if rules['DAS']:
-        edge += -0.14
-    # DOUBLE
-    if rules['DOUBLE'] == "9-11":
-        edge += 0.08
-    elif rules['DOUBLE'] == "10-11":
-        edge += 0.17
-    # RSA
-    if rules['RSA']:
-        edge += -0.08
-    # LS
-    if rules['LS']:
-        edge += -0.08
-    return round(edge, 3)
+    key = (tuple(sorted(rules.items())), decks)
+    if key not in _edge_cache:
+        _edge_cache[key] = round(house_edge(rules, decks), 3)
+    return _edge_cache[key]
+
+
+def cached_house_edge(rules, decks):
+    """The edge if it has been computed already, else None."""
+    return _edge_cache.get((tuple(sorted(rules.items())), decks))
+
+
+class EdgeWorker(QThread):
+    """
+    Computes exact edges off the GUI thread, about a second per deck count.
+    Only the latest rules asked for are worked on: a newer request takes
+    over between deck counts. `computed` is delivered on the GUI thread.
+    """
+    computed = pyqtSignal(object, int, float)
+
+    def __init__(self, decks, parent=None):
+        super().__init__(parent)
+        self.decks = decks
+        self.wake = threading.Condition()
+        self.pending = None
+        self.stopping = False
+
+    def request(self, rules):
+        with self.wake:
+            self.pending = rules
+            self.wake.notify()
+
+    def stop(self):
+        with self.wake:
+            self.stopping = True
+            self.wake.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.wake:
+                while self.pending is None and not self.stopping:
+                    self.wake.wait()
+                if self.stopping:
+                    return
+                rules, self.pending = self.pending, None
+            for decks in self.decks:
+                if self.pending is not None or self.stopping:
+                    break
+                self.computed.emit(rules, decks, calc_house_edge(rules, decks))
+
 
 class HouseEdgeCalculator(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("House Edge Calculator (lower is better)")
         self.setStyleSheet("background-color: #18171c; color: #fff;")
+        # Simulated edges from house_edge_sweep.py, if it has been run
+        self.sim_results = load_results()
         self.initUI()
     
     def initUI(self):
@@ -73,6 +118,7 @@ class HouseEdgeCalculator(QWidget):
         
         # House Edge Table
         self.edge_labels = {}
+        self.sim_labels = {}
         table = QHBoxLayout()
         decks = [1, 2, 4, 6, 8]
         self.deck_keys = decks
@@ -86,6 +132,11 @@ class HouseEdgeCalculator(QWidget):
             edge_lbl.setFont(QFont("Arial", 16, QFont.Bold))
             v.addWidget(edge_lbl, alignment=Qt.AlignCenter)
             self.edge_labels[d] = edge_lbl
+            sim_lbl = QLabel("")
+            sim_lbl.setFont(QFont("Arial", 9))
+            sim_lbl.setToolTip(SIM_MODEL)
+            v.addWidget(sim_lbl, alignment=Qt.AlignCenter)
+            self.sim_labels[d] = sim_lbl
             table.addLayout(v)
         frame = QFrame()
         frame.setLayout(table)
@@ -94,6 +145,9 @@ class HouseEdgeCalculator(QWidget):
         
         self.setLayout(layout)
         self.resize(700, 500)
+        self.edge_worker = EdgeWorker(decks, self)
+        self.edge_worker.computed.connect(self.edge_computed)
+        self.edge_worker.start()
         self.update_edges()
     
     def make_option_group(self, title, options, key):
@@ -135,15 +189,29 @@ class HouseEdgeCalculator(QWidget):
 
     def update_edges(self):
         rules = self.get_rule_values()
+        missing = False
         for d in self.deck_keys:
-            edge = calc_house_edge({
-                "H17": rules['H17'],
-                "DAS": rules['DAS'],
-                "DOUBLE": rules['DOUBLE'],
-                "RSA": rules['RSA'],
-                "LS": rules['LS'],
-            }, d)
-            self.edge_labels[d].setText(f"{edge:.3f}")
+            edge = cached_house_edge(rules, d)
+            if edge is None:
+                # Filled in by edge_computed when the worker gets to it
+                self.edge_labels[d].setText("...")
+                missing = True
+            else:
+                self.edge_labels[d].setText(f"{edge:.3f}")
+            sim = self.sim_results.get((tuple(sorted(rules.items())), d))
+            # The sweep plays the trainer's game, so this is another rule model, not a check on the edge above
+            self.sim_labels[d].setText(f"trainer game (sim): {sim['edge']:.3f} ± {sim['ci95']:.3f}" if sim else "")
+        if missing:
+            self.edge_worker.request(rules)
+
+    def edge_computed(self, rules, decks, edge):
+        # Results for rules that have since been toggled away are only cached
+        if rules == self.get_rule_values():
+            self.edge_labels[decks].setText(f"{edge:.3f}")
+
+    def closeEvent(self, event):
+        self.edge_worker.stop()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,90 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from rng import ShuffleStream
+from simulator import simulate
+
+RESULTS_PATH = os.path.join(BASE_DIR, "..", "data", "house_edge_sweep.json")
+
+# Same options as HouseEdgeCalculator
+DECKS = [1, 2, 4, 6, 8]
+RULE_OPTIONS = {
+    'H17': [True, False],
+    'DAS': [True, False],
+    'DOUBLE': ["Any", "9-11", "10-11"],
+    'RSA': [True, False],
+    'LS': [True, False],
+}
+
+
+def configurations():
+    """Every (rules, decks) combination the calculator can show."""
+    keys = list(RULE_OPTIONS)
+    for values in itertools.product(*RULE_OPTIONS.values()):
+        for decks in DECKS:
+            yield dict(zip(keys, values)), decks
+
+
+def run_config(task):
+    index, rules, decks, rounds, stream = task
+    # Every configuration shuffles from its own stream, so each one is
+    # reproducible on its own whatever the worker count.
+    result = simulate(rounds, num_decks=decks, rules=rules, use_deviations=False, seed=stream)
+    edge = -100.0 * result.ev()
+    ci = 100.0 * 1.96 * result.stddev() / math.sqrt(result.rounds)
+    return {
+        "index": index,
+        "rules": rules,
+        "decks": decks,
+        "rounds": result.rounds,
+        "seed": stream.seed,
+        "stream": list(stream.key),
+        "edge": round(edge, 4),
+        "ci95": round(ci, 4),
+    }
+
+
+def sweep(rounds, seed=0, workers=None):
+    """Simulate every configuration across a process pool. Returns the result rows."""
+    configs = list(configurations())
+    streams = ShuffleStream(seed).spawn(len(configs))
+    tasks = [(i, rules, decks, rounds, streams[i]) for i, (rules, decks) in enumerate(configs)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # One configuration per task keeps all workers busy until the end
+        return list(pool.map(run_config, tasks, chunksize=1))
+
+
+def load_results(path=RESULTS_PATH):
+    """Map of (rules tuple, decks) -> result row, or {} if no sweep has been saved."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {(tuple(sorted(row["rules"].items())), row["decks"]): row for row in data["results"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo house edge for every calculator rule set")
+    parser.add_argument("--rounds", type=int, default=1000000, help="rounds per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per core")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = sweep(args.rounds, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"rounds": args.rounds, "seed": args.seed, "results": results}, f, indent=1)
+    print(f"{len(results)} configurations x {args.rounds} rounds in {elapsed:.1f}s -> {args.output}")
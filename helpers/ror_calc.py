@@ -6,9 +6,10 @@ def risk_of_ruin(bankroll_units, edge=0.004, stddev=1.15):
     ror = math.exp(-2 * edge / variance * bankroll_units)
     return ror
 
-bankroll = 10000
-unit = 25
-units = bankroll // unit
+if __name__ == "__main__":
+    bankroll = 10000
+    unit = 25
+    units = bankroll // unit
 
-ror = risk_of_ruin(units)
-print(f"Bankroll: ${bankroll}, Unit: ${unit}, Units: {units}, Risk of Ruin: {ror:.2%}")
\ No newline at end of file
+    ror = risk_of_ruin(units)
+    print(f"Bankroll: ${bankroll}, Unit: ${unit}, Units: {units}, Risk of Ruin: {ror:.2%}")
\ No newline at end of file
@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from simulator import outcomes_by_true_count
+from ror_calc import risk_of_ruin
+from strategy import ramp_bet
+
+# Units bet by true count; below the lowest key bets the lowest, above the highest bets the highest
+DEFAULT_RAMP = {1: 1, 2: 2, 3: 4, 4: 8, 5: 12}
+
+
+def hand_distribution(tallies, ramp):
+    """
+    Per-hand distribution of units won under a bet ramp, from
+    outcomes_by_true_count tallies. Returns (values, probabilities).
+    """
+    total = sum(sum(counts.values()) for counts in tallies.values())
+    outcomes = {}
+    for true_count, counts in tallies.items():
+        bet = ramp_bet(ramp, true_count)
+        for net, n in counts.items():
+            value = net * bet
+            outcomes[value] = outcomes.get(value, 0) + n
+    values = np.array(sorted(outcomes), dtype=np.float64)
+    probs = np.array([outcomes[v] for v in sorted(outcomes)], dtype=np.float64) / total
+    return values, probs
+
+
+# Hands are sampled by indexing a table of outcome quantiles with random ints,
+# which is much faster than a searchsorted per draw. 2**20 entries keep each
+# outcome's probability within 1e-6.
+TABLE_BITS = 20
+
+
+def sample_table(values, probs):
+    size = 1 << TABLE_BITS
+    cdf = np.cumsum(probs)
+    cdf[-1] = 1.0
+    return values[np.searchsorted(cdf, (np.arange(size) + 0.5) / size, side="right")]
+
+
+def simulate_ruin(values, probs, bankroll, hands, paths=200000, chunk=32, seed=None):
+    """
+    Run `paths` bankroll trajectories of `hands` hands at once, each hand an
+    independent draw from (values, probs). Trajectories stop at ruin (bankroll
+    at or below zero).
+    Returns a dict of per-path arrays: 'ruined', 'double_at' (hand number, or
+    -1 if never doubled) and 'max_drawdown' (units).
+    """
+    rng = np.random.default_rng(seed)
+    table = sample_table(values, probs)
+    bank = np.full(paths, float(bankroll))
+    peak = bank.copy()
+    max_drawdown = np.zeros(paths)
+    ruined = np.zeros(paths, dtype=bool)
+    double_at = np.full(paths, -1, dtype=np.int64)
+
+    for start in range(0, hands, chunk):
+        n = min(chunk, hands - start)
+        steps = table[rng.integers(0, 1 << TABLE_BITS, (n, paths), dtype=np.uint32)]
+        steps[:, ruined] = 0.0
+        path = np.cumsum(steps, axis=0)
+        path += bank
+
+        # Freeze each trajectory at zero from the hand it goes broke
+        going_broke = (path.min(axis=0) <= 0) & ~ruined
+        if going_broke.any():
+            cols = path[:, going_broke]
+            cols[np.logical_or.accumulate(cols <= 0, axis=0)] = 0.0
+            path[:, going_broke] = cols
+            ruined |= going_broke
+
+        running_peak = np.maximum.accumulate(path, axis=0)
+        np.maximum(running_peak, peak, out=running_peak)
+        np.maximum(max_drawdown, (running_peak - path).max(axis=0), out=max_drawdown)
+        peak = running_peak[-1]
+
+        newly = (double_at < 0) & (peak >= 2 * bankroll)
+        if newly.any():
+            double_at[newly] = start + (path[:, newly] >= 2 * bankroll).argmax(axis=0) + 1
+        bank = path[-1]
+
+    return {"ruined": ruined, "double_at": double_at, "max_drawdown": max_drawdown}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo risk of ruin with a true-count bet ramp")
+    parser.add_argument("--bankroll", type=float, default=400, help="bankroll in units")
+    parser.add_argument("--hands", type=int, default=100000)
+    parser.add_argument("--paths", type=int, default=200000)
+    parser.add_argument("--sample-rounds", type=int, default=500000,
+                        help="rounds played through the game engine to build the win/loss distribution")
+    parser.add_argument("--ramp", default=",".join(f"{tc}:{bet}" for tc, bet in DEFAULT_RAMP.items()),
+                        help="true count:units pairs, e.g. 1:1,2:2,3:4")
+    parser.add_argument("--decks", type=int, default=8)
+    parser.add_argument("--penetration", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    ramp = {int(tc): float(bet) for tc, bet in (pair.split(":") for pair in args.ramp.split(","))}
+    start = time.perf_counter()
+    tallies = outcomes_by_true_count(args.sample_rounds, num_decks=args.decks, reshuffle_pct=args.penetration,
+                                     seed=args.seed)
+    values, probs = hand_distribution(tallies, ramp)
+    mean = float(values @ probs)
+    stddev = float(np.sqrt(((values - mean) ** 2) @ probs))
+    print(f"Sampled {args.sample_rounds} rounds in {time.perf_counter() - start:.1f}s: "
+          f"EV {mean:+.4f} units/hand, SD {stddev:.3f} units/hand")
+
+    start = time.perf_counter()
+    result = simulate_ruin(values, probs, args.bankroll, args.hands, args.paths, seed=args.seed)
+    print(f"Simulated {args.paths} paths x {args.hands} hands in {time.perf_counter() - start:.1f}s")
+
+    print(f"Risk of ruin over {args.hands} hands: {result['ruined'].mean():.2%}  "
+          f"(closed form, infinite play: {min(risk_of_ruin(args.bankroll, mean, stddev), 1.0):.2%})")
+    doubled = result["double_at"][result["double_at"] > 0]
+    print(f"Doubled bankroll: {len(doubled) / args.paths:.2%}")
+    if len(doubled):
+        q = np.percentile(doubled, [25, 50, 75, 90])
+        print("Hands to double (25/50/75/90%): " + " / ".join(f"{v:,.0f}" for v in q))
+    q = np.percentile(result["max_drawdown"], [50, 90, 95, 99])
+    print("Max drawdown in units (50/90/95/99%): " + " / ".join(f"{v:,.1f}" for v in q))
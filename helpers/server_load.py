@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import secrets
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from server import TrainerServer, TrainerService, frame, read_frame
+
+
+class HttpClient:
+    """Minimal keep-alive JSON client for the trainer service."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(b"%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n"
+                          % (method.encode(), path.encode(), len(data)) + data)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def call(self, action, session=None, **params):
+        if action == "create":
+            return await self.request("POST", "/sessions", params)
+        if action in ("best-move", "count"):
+            return await self.request("GET", f"/sessions/{session}/{action}")
+        return await self.request("POST", f"/sessions/{session}/{action}", params)
+
+    def close(self):
+        self.writer.close()
+
+
+class WebSocketClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(secrets.token_bytes(16))
+        writer.write(b"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Key: " + key + b"\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        if b" 101 " not in await reader.readline():
+            raise ConnectionError("WebSocket upgrade refused")
+        while await reader.readline() != b"\r\n":
+            pass
+        return cls(reader, writer)
+
+    async def call(self, action, session=None, **params):
+        self.writer.write(frame(json.dumps(dict(params, action=action, session=session)).encode(), mask=True))
+        _, payload = await read_frame(self.reader)
+        reply = json.loads(payload)
+        return reply.pop("status", 200), reply
+
+    def close(self):
+        self.writer.close()
+
+
+async def trainee(client_class, host, port, rounds, bet, latencies):
+    """One trainee playing `rounds` rounds by the book on its own connection."""
+    client = await client_class.connect(host, port)
+
+    async def timed(*args, **kwargs):
+        start = time.perf_counter()
+        status, reply = await client.call(*args, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            raise RuntimeError(f"{args[0]}: {reply}")
+        return reply
+
+    state = await timed("create", balance=10 ** 9, max_bet=bet)
+    session = state["session"]
+    for _ in range(rounds):
+        state = await timed("bet", session, amount=bet)
+        while state["in_progress"]:
+            move = (await timed("best-move", session))["move"]
+            state = await timed(move.lower(), session)
+            assert state.get("feedback", {}).get("correct", True), state
+        await timed("count", session)
+    client.close()
+    return state["balance"] - 10 ** 9
+
+
+async def run(args):
+    server = None
+    host, port = args.host, args.port
+    if not args.connect:
+        server = await TrainerServer(TrainerService(max_sessions=args.sessions), host, 0).start()
+        port = server.port
+    latencies = []
+    client_class = WebSocketClient if args.websocket else HttpClient
+    start = time.perf_counter()
+    nets = await asyncio.gather(*(trainee(client_class, host, port, args.rounds, args.bet, latencies)
+                                  for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.close()
+    latencies.sort()
+    print(f"{args.sessions} sessions x {args.rounds} rounds over {'WebSocket' if args.websocket else 'HTTP'}: "
+          f"{len(latencies)} calls in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} calls/s)")
+    for pct in (50, 90, 99):
+        print(f"p{pct} latency: {latencies[len(latencies) * pct // 100] * 1e3:.3f} ms")
+    print(f"Net over all sessions: {sum(nets):+,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive the trainer service with concurrent by-the-book trainees")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--bet", type=int, default=10)
+    parser.add_argument("--websocket", action="store_true", help="use /ws instead of HTTP requests")
+    parser.add_argument("--connect", action="store_true",
+                        help="use a running server at --host/--port instead of starting one in-process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,181 @@
+"""
+Basic strategy charts computed from exact EVs for any rule set and deck count.
+
+The charts are total-dependent: for every two-card hand the EV of each
+first decision comes from ev.EVAnalyzer off a fresh shoe, and the hands
+making the same hard or soft total are averaged, weighted by how often they
+are dealt against the upcard. Pairs are charted on their own EVs. Charts
+come out in the formats of the hand-typed ones in strategy.py and are cached
+as JSON under data/strategy, one file per rule set and deck count.
+"""
+import argparse
+import json
+import os
+from collections import defaultdict
+
+import strategy
+from blackjack import DEFAULT_RULES
+from ev import EVAnalyzer, full_shoe, remove
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHART_DIR = os.path.join(BASE_DIR, "..", "data", "strategy")
+
+# Bump when the generator changes, so cached charts are recomputed
+CHART_VERSION = 1
+
+# Chart columns: dealer upcard 2-10, then Ace
+UPCARDS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 1)
+
+
+def full_rules(rules=None):
+    full = dict(DEFAULT_RULES)
+    full.update(rules or {})
+    return full
+
+
+def chart_name(rules, num_decks):
+    """Readable name of the computed chart set for a rule set, also its cache file name."""
+    rules = full_rules(rules)
+    return "{}D {} {} D{} {} {}".format(num_decks, "H17" if rules['H17'] else "S17",
+                                        "DAS" if rules['DAS'] else "NDAS", rules['DOUBLE'],
+                                        "RSA" if rules['RSA'] else "NRSA", "LS" if rules['LS'] else "NS")
+
+
+def chart_path(rules, num_decks):
+    return os.path.join(CHART_DIR, chart_name(rules, num_decks).replace(" ", "_") + ".json")
+
+
+def _best(evs, actions):
+    return max((evs[a], a) for a in actions if a in evs)
+
+
+def generate_charts(rules, num_decks):
+    """
+    (hard, soft, split, surrender) charts for `rules` and `num_decks`.
+    Hard charts cover totals 4-20 and soft charts 12-20; doubles are "D"
+    (otherwise hit) or "Ds" (otherwise stand).
+    """
+    rules = full_rules(rules)
+    analyzer = EVAnalyzer(rules)
+    shoe = full_shoe(num_decks)
+    hard, soft, split, surrender = {}, {}, {}, {}
+    for idx, upcard in enumerate(UPCARDS):
+        comp_up = remove(shoe, upcard)
+        left = sum(comp_up)
+        # (soft, total) -> action -> probability weighted EV, and total probability
+        sums = defaultdict(lambda: defaultdict(float))
+        weights = defaultdict(float)
+        for c1 in range(1, 11):
+            p1 = comp_up[c1 - 1] / left
+            comp1 = remove(comp_up, c1)
+            for c2 in range(c1, 11):
+                if c1 + c2 == 11 and c1 == 1:
+                    continue  # blackjack
+                p = p1 * comp1[c2 - 1] / (left - 1) * (1 if c1 == c2 else 2)
+                if not p:
+                    continue
+                evs = analyzer.action_evs([c1, c2], upcard, remove(comp1, c2))
+                if c1 == c2:
+                    others = _best(evs, evs.keys() - {"Split"})[0]
+                    split.setdefault(c1, [False] * 10)[idx] = evs["Split"] > others
+                # Pairs count towards their total when they aren't split
+                key = (c1 == 1, c1 + c2)
+                weights[key] += p
+                for action, ev in evs.items():
+                    if action != "Split":
+                        sums[key][action] += p * ev
+        for (is_soft, total), action_sums in sums.items():
+            evs = {action: ev / weights[is_soft, total] for action, ev in action_sums.items()}
+            move = _best(evs, ("Stand", "Hit", "Double"))[1]
+            if move == "Double":
+                move = "D" if evs["Hit"] > evs["Stand"] else "Ds"
+            else:
+                move = move[0]
+            if is_soft:
+                soft.setdefault(total + 10, [None] * 10)[idx] = move
+            else:
+                hard.setdefault(total, [None] * 10)[idx] = move
+                if "Surrender" in evs:
+                    surrender.setdefault(total, [False] * 10)[idx] = \
+                        evs["Surrender"] > _best(evs, ("Stand", "Hit", "Double"))[0]
+    surrender = {total: row for total, row in surrender.items() if any(row)}
+    return hard, soft, split, surrender
+
+
+def save_charts(path, rules, num_decks, charts):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    hard, soft, split, surrender = charts
+    data = {"version": CHART_VERSION, "decks": num_decks, "rules": full_rules(rules),
+            "hard": hard, "soft": soft, "split": split, "surrender": surrender}
+    # Write then rename, so a reader never sees a half-written file
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def read_charts(path):
+    """Charts from a cache file, or None if it's missing or from another generator version."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != CHART_VERSION:
+        return None
+    return tuple({int(total): row for total, row in data[name].items()}
+                 for name in ("hard", "soft", "split", "surrender"))
+
+
+def load_charts(rules=None, num_decks=8):
+    """Charts for a rule set, from the cache or generated and cached."""
+    path = chart_path(rules, num_decks)
+    charts = read_charts(path)
+    if charts is None:
+        charts = generate_charts(rules, num_decks)
+        save_charts(path, rules, num_decks, charts)
+    return charts
+
+
+def computed_chart(rules=None, num_decks=8):
+    """Register the computed charts for a rule set with the strategy module. Returns the chart name."""
+    name = chart_name(rules, num_decks)
+    if name not in strategy.CHARTS:
+        strategy.register_chart(name, *load_charts(rules, num_decks))
+    return name
+
+
+def format_charts(charts):
+    """Charts as text tables, like the ones in strategy.py."""
+    hard, soft, split, surrender = charts
+    header = "      " + " ".join(f"{'A' if up == 1 else up:>2}" for up in UPCARDS)
+    lines = []
+    def soft_label(total):
+        return "A,A" if total == 12 else f"A,{total - 11}"
+
+    def pair_label(value):
+        card = "A" if value == 1 else value
+        return f"{card},{card}"
+
+    for title, chart, label in (("Hard", hard, str), ("Soft", soft, soft_label),
+                                ("Pairs", split, pair_label), ("Surrender", surrender, str)):
+        lines += ["", title, header]
+        for key in sorted(chart, reverse=True):
+            cells = ("Y" if c is True else "-" if c is False else c for c in chart[key])
+            lines.append(f"{label(key):>5} " + " ".join(f"{c:>2}" for c in cells))
+    return "\n".join(lines[1:])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute total-dependent basic strategy for a rule set")
+    parser.add_argument("--decks", type=int, default=8)
+    parser.add_argument("--rules", default="{}", help='JSON rule overrides, e.g. \'{"H17": false}\'')
+    parser.add_argument("--force", action="store_true", help="recompute even if cached")
+    args = parser.parse_args()
+
+    rules = json.loads(args.rules)
+    path = chart_path(rules, args.decks)
+    if args.force and os.path.exists(path):
+        os.remove(path)
+    print(chart_name(rules, args.decks))
+    print(format_charts(load_charts(rules, args.decks)))
+    print(f"\nCached at {os.path.abspath(path)}")
@@ -1,13 +1,11 @@
 from shoe import Shoe
+from history import LOSE, PUSH, WIN, BLACKJACK, SURRENDER, DOUBLED, BUSTED, FLAG_DEALER_BLACKJACK
+
+CARD_VALUES = {'A': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
+               'T': 10, 'J': 10, 'Q': 10, 'K': 10}
 
 def card_value(card):
-    rank = card[0]
-    if rank in 'TJQK':
-        return 10
-    elif rank == 'A':
-        return 1
-    else:
-        return int(rank)
+    return CARD_VALUES[card[0]]
 
 def hand_value(hand):
     """Returns tuple (value, is_soft)"""
@@ -21,50 +19,120 @@ def hand_value(hand):
         num_aces -= 1
     return value, is_soft
 
+# Table rules, keyed like HouseEdgeCalculator. The defaults are the trainer's.
+DEFAULT_RULES = {
+    'H17': True,       # dealer hits soft 17
+    'DAS': True,       # double after split
+    'DOUBLE': "Any",   # "Any", "9-11" or "10-11"
+    'RSA': True,       # resplit aces
+    'LS': False,       # late surrender
+}
+
 def is_blackjack(hand):
     return len(hand) == 2 and hand_value(hand)[0] == 21
 
+def play_dealer_hand(dealer_hand, shoe, h17):
+    """Draw to `dealer_hand` from `shoe` until it stands; `h17` hits soft 17."""
+    hard_total = sum(CARD_VALUES[card[0]] for card in dealer_hand)
+    has_ace = any(card[0] == 'A' for card in dealer_hand)
+    while True:
+        # Soft when an ace can count as 11
+        is_soft = has_ace and hard_total <= 11
+        value = hard_total + 10 if is_soft else hard_total
+        if value < 17 or (value == 17 and is_soft and h17):
+            card = shoe.deal()
+            dealer_hand.append(card)
+            hard_total += CARD_VALUES[card[0]]
+            has_ace = has_ace or card[0] == 'A'
+        else:
+            break
+
 class PlayerHand:
+    # Running hard total and ace count are kept up to date by add_card, so
+    # value/soft/bust checks never rescan the cards. Assigning `cards`
+    # recomputes them; don't append to the list directly.
+    __slots__ = ('_cards', 'hard_total', 'num_aces', 'bet', 'doubled',
+                 'finished', 'busted', 'surrendered', 'sit_out_mode')
+
     def __init__(self, bet, cards=None, doubled=False):
         self.cards = cards or []
         self.bet = bet
         self.doubled = doubled
         self.finished = False  # finished = stood, busted, blackjack, or after doubling
         self.busted = False
+        self.surrendered = False
         self.sit_out_mode = False
 
+    @property
+    def cards(self):
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards):
+        self._cards = cards
+        self.hard_total = sum(CARD_VALUES[card[0]] for card in cards)
+        self.num_aces = sum(1 for card in cards if card[0] == 'A')
+
+    def snapshot(self):
+        return (tuple(self._cards), self.hard_total, self.num_aces, self.bet, self.doubled,
+                self.finished, self.busted, self.surrendered, self.sit_out_mode)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        hand = cls.__new__(cls)
+        (cards, hand.hard_total, hand.num_aces, hand.bet, hand.doubled,
+         hand.finished, hand.busted, hand.surrendered, hand.sit_out_mode) = state
+        hand._cards = list(cards)
+        return hand
+
     def can_split(self):
         return (
-            len(self.cards) == 2 and
-            card_value(self.cards[0]) == card_value(self.cards[1])
+            len(self._cards) == 2 and
+            card_value(self._cards[0]) == card_value(self._cards[1])
         )
 
     def can_double(self):
-        return len(self.cards) == 2 and not self.doubled
+        return len(self._cards) == 2 and not self.doubled
 
     def add_card(self, card):
-        self.cards.append(card)
-        if self.is_bust():
+        self._cards.append(card)
+        rank = card[0]
+        self.hard_total += CARD_VALUES[rank]
+        if rank == 'A':
+            self.num_aces += 1
+        if self.hard_total > 21:
             self.finished = True
 
     def is_bust(self):
-        return hand_value(self.cards)[0] > 21
+        return self.hard_total > 21
 
     def is_blackjack(self):
-        return is_blackjack(self.cards)
+        return len(self._cards) == 2 and self.hard_total == 11 and self.num_aces > 0
 
     def value(self):
-        return hand_value(self.cards)[0]
+        if self.num_aces and self.hard_total <= 11:
+            return self.hard_total + 10
+        return self.hard_total
 
     def is_soft(self):
-        return hand_value(self.cards)[1]
+        return self.num_aces > 0 and self.hard_total <= 11
 
 class BlackjackGame:
-    def __init__(self, starting_balance=10000, min_bet=10, max_bet=1000):
-        self.shoe = Shoe()
+    def __init__(self, starting_balance=10000, min_bet=10, max_bet=1000, shoe=None, rules=None, history=None,
+                 stats=None):
+        self.shoe = shoe if shoe is not None else Shoe()
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
         self.balance = starting_balance
         self.min_bet = min_bet
         self.max_bet = max_bet
+        # Optional history.HandHistoryWriter; every finished round is appended
+        self.history = history
+        # Optional stats.CountStats; every finished round's net, in units of
+        # the round's initial bet, is added with the true count at the bet
+        self.stats = stats
+        self.round_start = None
+        self.decisions = []
         self.reset_round()
 
     def reset_round(self):
@@ -76,18 +144,34 @@ class BlackjackGame:
         self.message = ""
         self.sit_out_mode = False
 
-    def start_round(self, bet):
+    def start_round(self, bet, cards=None, dealer_hand=None, counts=None):
+        """
+        Place `bet` and deal. A table dealing several seats passes this seat's
+        two cards, the shared dealer hand and the (running, true) count from
+        before the deal; otherwise the four cards come from the shoe in one
+        batch, in dealing order.
+        """
         if bet < self.min_bet or bet > self.max_bet or bet > self.balance:
             self.message = f"Invalid bet: {bet}"
             return False
 
         self.current_bet = bet
+        # Shuffle before the counts are read, so a new shoe's first round
+        # isn't filed under the old shoe's count
+        if cards is None and self.shoe.needs_reshuffle():
+            self.shoe.reshuffle()
+        if self.history is not None or self.stats is not None:
+            if counts is None:
+                counts = (self.shoe.get_running_count(), self.shoe.get_true_count())
+            self.round_start = (self.balance,) + tuple(counts) + (bet,)
+            self.decisions = []
         # Deduct bet *immediately* visual purposes
         self.balance -= bet
-        self.player_hands = [PlayerHand(bet)]
-        self.dealer_hand = [self.shoe.deal(), self.shoe.deal()]
-        for hand in self.player_hands:
-            hand.cards = [self.shoe.deal(), self.shoe.deal()]
+        if cards is None:
+            first, up, second, hole = self.shoe.deal_many(4)
+            cards, dealer_hand = [first, second], [up, hole]
+        self.player_hands = [PlayerHand(bet, cards)]
+        self.dealer_hand = dealer_hand
         self.current_hand_index = 0
         self.in_progress = True
         self.message = ""
@@ -105,16 +189,44 @@ class BlackjackGame:
                 self.message = "Blackjack! You win 1.5x your bet."
             self.balance += result
             self.in_progress = False
+            if self.history is not None:
+                self.write_history([PUSH if dealer_bj else BLACKJACK])
+            if self.stats is not None:
+                self.add_stats()
             return True
 
         return True
 
+    def snapshot(self):
+        """
+        Compact copy of the round, balance, shoe and counts to branch
+        rollouts from: restore() puts them back without copying the shoe.
+        Hand history and stats aren't rewound, so rollouts should use a game
+        with neither.
+        """
+        return (self.shoe.snapshot(), self.balance, self.current_bet, self.in_progress, self.current_hand_index,
+                tuple(self.dealer_hand), tuple(hand.snapshot() for hand in self.player_hands),
+                self.message, self.sit_out_mode, self.round_start)
+
+    def restore(self, state):
+        (shoe, self.balance, self.current_bet, self.in_progress, self.current_hand_index,
+         dealer_hand, hands, self.message, self.sit_out_mode, self.round_start) = state
+        self.shoe.restore(shoe)
+        self.dealer_hand = list(dealer_hand)
+        self.player_hands = [PlayerHand.from_snapshot(hand) for hand in hands]
+
     def get_current_hand(self):
         return self.player_hands[self.current_hand_index]
 
+    def record_decision(self, action):
+        if self.history is not None:
+            self.decisions.append((self.current_hand_index, action,
+                                   self.shoe.get_running_count(), self.shoe.get_true_count()))
+
     def player_hit(self):
         hand = self.get_current_hand()
         if not hand.finished:
+            self.record_decision("Hit")
             hand.add_card(self.shoe.deal())
             if hand.is_bust():
                 hand.finished = True
@@ -124,11 +236,38 @@ class BlackjackGame:
 
     def player_stand(self):
         hand = self.get_current_hand()
+        self.record_decision("Stand")
         hand.finished = True
 
+    def can_double(self, hand):
+        """Whether the table rules and balance allow doubling this hand."""
+        if not hand.can_double() or self.balance < hand.bet:
+            return False
+        if len(self.player_hands) > 1 and not self.rules['DAS']:
+            return False
+        if self.rules['DOUBLE'] != "Any":
+            low = 9 if self.rules['DOUBLE'] == "9-11" else 10
+            if hand.is_soft() or not low <= hand.hard_total <= 11:
+                return False
+        return True
+
+    def can_split(self, hand):
+        """Whether the table rules and balance allow splitting this hand."""
+        if len(self.player_hands) >= 4 or not hand.can_split() or self.balance < hand.bet:
+            return False
+        # A pair of aces in a split round is a resplit
+        if len(self.player_hands) > 1 and hand.cards[0][0] == 'A' and not self.rules['RSA']:
+            return False
+        return True
+
+    def can_surrender(self, hand):
+        """Late surrender: first two cards of an unsplit hand only."""
+        return self.rules['LS'] and len(self.player_hands) == 1 and len(hand.cards) == 2 and not hand.finished
+
     def player_double(self):
         hand = self.get_current_hand()
-        if hand.can_double() and self.balance >= hand.bet:
+        if self.can_double(hand):
+            self.record_decision("Double")
             self.balance -= hand.bet
             hand.bet *= 2
             hand.doubled = True
@@ -141,13 +280,21 @@ class BlackjackGame:
             return
 
         hand = self.get_current_hand()
-        if hand.can_split() and self.balance >= hand.bet:
+        if self.can_split(hand):
+            self.record_decision("Split")
             self.balance -= hand.bet
             card1, card2 = hand.cards
             # Replace current hand with two new hands
             self.player_hands[self.current_hand_index] = PlayerHand(hand.bet, [card1, self.shoe.deal()])
             self.player_hands.insert(self.current_hand_index + 1, PlayerHand(hand.bet, [card2, self.shoe.deal()]))
 
+    def player_surrender(self):
+        hand = self.get_current_hand()
+        if self.can_surrender(hand):
+            self.record_decision("Surrender")
+            hand.surrendered = True
+            hand.finished = True
+
     def advance_hand(self):
         # Move to the next unfinished hand, if any
         while self.current_hand_index < len(self.player_hands) and self.player_hands[self.current_hand_index].finished:
@@ -158,12 +305,7 @@ class BlackjackGame:
 
     def play_dealer(self):
         """Dealer plays out their hand per standard rules."""
-        while True:
-            value, is_soft = hand_value(self.dealer_hand)
-            if value < 17 or (value == 17 and is_soft):
-                self.dealer_hand.append(self.shoe.deal())
-            else:
-                break
+        play_dealer_hand(self.dealer_hand, self.shoe, self.rules['H17'])
 
     def settle_bets(self):
         dealer_val, _ = hand_value(self.dealer_hand)
@@ -175,7 +317,9 @@ class BlackjackGame:
                 continue
             player_val = hand.value()
             player_bj = hand.is_blackjack()
-            if dealer_val > 21:
+            if hand.surrendered:
+                result = 0 if dealer_bj else int(hand.bet * 0.5)  # <--- Half back unless dealer had Blackjack
+            elif dealer_val > 21:
                 result = hand.bet * 2         # <--- Win: give back bet + winnings
             elif player_bj and not dealer_bj:
                 result = int(hand.bet * 2.5)  # <--- 1.5x win + original bet
@@ -192,18 +336,50 @@ class BlackjackGame:
             self.balance += result
             results.append((result, False))
         self.in_progress = False
+        if self.history is not None:
+            self.write_history([self.hand_result(hand, payout, dealer_bj)
+                                for hand, (payout, _) in zip(self.player_hands, results)])
+        if self.stats is not None:
+            self.add_stats()
         return results
+
+    def hand_result(self, hand, payout, dealer_bj):
+        """Hand history result code for a settled hand."""
+        if hand.surrendered:
+            outcome = SURRENDER
+        elif hand.is_bust():
+            outcome = LOSE | BUSTED
+        elif payout == 0:
+            outcome = LOSE
+        elif payout == hand.bet:
+            outcome = PUSH
+        elif payout > 2 * hand.bet:
+            outcome = BLACKJACK
+        else:
+            outcome = WIN
+        return outcome | DOUBLED if hand.doubled else outcome
+
+    def write_history(self, results):
+        balance, running_count, true_count, _ = self.round_start
+        flags = FLAG_DEALER_BLACKJACK if is_blackjack(self.dealer_hand) else 0
+        self.history.write(self.current_bet, self.balance - balance, running_count, true_count,
+                           self.dealer_hand, [hand.cards for hand in self.player_hands],
+                           results, self.decisions, flags=flags)
     
+    def add_stats(self):
+        balance, _, true_count, bet = self.round_start
+        self.stats.add((self.balance - balance) / bet, true_count)
+
     def sit_out_round(self):
         if self.in_progress:
             self.message = "A round is already in progress."
             return False
         self.sit_out_mode = True
         # No bet, just deal cards
-        self.player_hands = [PlayerHand(0)]
-        self.dealer_hand = [self.shoe.deal(), self.shoe.deal()]
+        first, up, second, hole = self.shoe.deal_many(4)
+        self.player_hands = [PlayerHand(0, [first, second])]
+        self.dealer_hand = [up, hole]
         for hand in self.player_hands:
-            hand.cards = [self.shoe.deal(), self.shoe.deal()]
             hand.finished = True  # Don't play out, player is sitting out
         self.current_hand_index = 0
         self.in_progress = True
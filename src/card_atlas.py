@@ -0,0 +1,151 @@
+"""
+Pre-rasterized card sprite atlas.
+
+Every card face and the back are rendered once per card size and device
+pixel ratio into a single image, 13 columns (A-K) by 5 rows (one per suit,
+then the back). Atlases are cached as PNGs under data/card_atlas, named by
+a hash of the source images, so editing an SVG invalidates them.
+
+Rendering only uses QImage and QSvgRenderer, which are safe off the GUI
+thread; AtlasBuilder runs it in the background.
+"""
+import argparse
+import hashlib
+import os
+import sys
+
+from PyQt5.QtCore import QRect, QRectF, QThread, Qt, pyqtSignal
+from PyQt5.QtGui import QGuiApplication, QImage, QPainter
+from PyQt5.QtSvg import QSvgRenderer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+SVG_PATH = os.path.join(PROJECT_ROOT, "assets", "svg-cards")
+PNG_PATH = os.path.join(PROJECT_ROOT, "assets", "png")
+ATLAS_DIR = os.path.join(PROJECT_ROOT, "data", "card_atlas")
+
+# Bump when the layout or rendering changes
+ATLAS_VERSION = 1
+
+RANKS = 'A23456789TJQK'
+SUITS = 'HDCS'
+RANK_NAMES = {'A': 'ace', 'T': '10', 'J': 'jack', 'Q': 'queen', 'K': 'king'}
+SUIT_NAMES = {'C': 'clubs', 'D': 'diamonds', 'H': 'hearts', 'S': 'spades'}
+
+
+def card_svg(card_code):
+    rank = RANK_NAMES.get(card_code[0], card_code[0])
+    return os.path.join(SVG_PATH, f"{rank}_of_{SUIT_NAMES[card_code[1]]}.svg")
+
+
+def card_png(card_code):
+    rank = RANK_NAMES.get(card_code[0], card_code[0])
+    return os.path.join(PNG_PATH, f"{rank}_of_{SUIT_NAMES[card_code[1]]}.png")
+
+
+def back_source():
+    """The back has no SVG in the bundled set, so it falls back to the PNG."""
+    svg = os.path.join(SVG_PATH, "back.svg")
+    return svg if os.path.exists(svg) else os.path.join(PNG_PATH, "back@2x.png")
+
+
+def sprite_rect(key, width, height):
+    """Rect of a card code or "back" in an atlas of `width` x `height` cards, in pixels."""
+    if key == "back":
+        col, row = 0, len(SUITS)
+    else:
+        col, row = RANKS.index(key[0]), SUITS.index(key[1])
+    return QRect(col * width, row * height, width, height)
+
+
+def sources():
+    return [card_svg(rank + suit) for suit in SUITS for rank in RANKS] + [back_source()]
+
+
+def source_hash():
+    """Hash of every source image, so any edit gives a new atlas name."""
+    digest = hashlib.sha256(f"v{ATLAS_VERSION}".encode())
+    for path in sources():
+        digest.update(os.path.basename(path).encode())
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def atlas_path(width, height, dpr, digest=None):
+    return os.path.join(ATLAS_DIR, f"{digest or source_hash()}_{width}x{height}@{dpr:g}.png")
+
+
+def _draw(painter, path, rect):
+    if not os.path.exists(path):
+        return
+    if path.endswith(".svg"):
+        QSvgRenderer(path).render(painter, QRectF(rect))
+    else:
+        image = QImage(path)
+        # @2x files load with a device pixel ratio of 2; the atlas works in pixels
+        image.setDevicePixelRatio(1.0)
+        painter.drawImage(rect, image.scaled(rect.width(), rect.height(), Qt.IgnoreAspectRatio,
+                                             Qt.SmoothTransformation))
+
+
+def render_atlas(width, height, dpr):
+    """Render every card at `width` x `height` logical pixels into one QImage at device pixels."""
+    w, h = round(width * dpr), round(height * dpr)
+    image = QImage(w * len(RANKS), h * (len(SUITS) + 1), QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    for suit in SUITS:
+        for rank in RANKS:
+            _draw(painter, card_svg(rank + suit), sprite_rect(rank + suit, w, h))
+    _draw(painter, back_source(), sprite_rect("back", w, h))
+    painter.end()
+    return image
+
+
+def load_atlas(width, height, dpr):
+    """Cached atlas image, or None if it hasn't been built for these sources."""
+    path = atlas_path(width, height, dpr)
+    if not os.path.exists(path):
+        return None
+    image = QImage(path)
+    return None if image.isNull() else image
+
+
+def build_atlas(width, height, dpr):
+    """Render an atlas and save it to the cache. Returns the image."""
+    image = render_atlas(width, height, dpr)
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+    path = atlas_path(width, height, dpr)
+    # Write then rename, so a reader never sees a half-written file
+    tmp = path + ".tmp"
+    image.save(tmp, "PNG")
+    os.replace(tmp, path)
+    return image
+
+
+class AtlasBuilder(QThread):
+    """Builds an atlas in the background; `built` is delivered on the GUI thread."""
+    built = pyqtSignal(int, int, float, QImage)
+
+    def __init__(self, width, height, dpr, parent=None):
+        super().__init__(parent)
+        self.size = (width, height, dpr)
+
+    def run(self):
+        self.built.emit(*self.size, build_atlas(*self.size))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild the trainer's card sprite atlases")
+    parser.add_argument("--width", type=int, default=70)
+    parser.add_argument("--height", type=int, default=105)
+    parser.add_argument("--dpr", type=float, nargs="+", default=[1.0, 2.0], help="device pixel ratios")
+    args = parser.parse_args()
+
+    app = QGuiApplication(sys.argv)
+    for dpr in args.dpr:
+        build_atlas(args.width, args.height, dpr)
+        print(atlas_path(args.width, args.height, dpr))
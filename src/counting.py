@@ -0,0 +1,117 @@
+"""
+Card counting systems as tag tables.
+
+Tags are listed per rank index: Ace, 2-9, then ten-valued cards. A
+CardCounter keeps one running count per system and updates them all from a
+single precomputed tag tuple per card, so tracking several systems costs one
+lookup and one tuple add per dealt card.
+"""
+import math
+from operator import add
+
+RANK_INDEX = {'A': 0, '2': 1, '3': 2, '4': 3, '5': 4, '6': 5, '7': 6, '8': 7, '9': 8,
+              'T': 9, 'J': 9, 'Q': 9, 'K': 9}
+
+# name -> (tags A,2,3,4,5,6,7,8,9,T; initial running count per deck; plus a constant)
+# Unbalanced systems start below zero so the pivot lands near zero.
+SYSTEMS = {
+    "Hi-Lo":        ((-1, 1, 1, 1, 1, 1, 0, 0, 0, -1), 0, 0),
+    "KO":           ((-1, 1, 1, 1, 1, 1, 1, 0, 0, -1), -4, 4),
+    "Hi-Opt II":    ((0, 1, 1, 2, 2, 1, 1, 0, 0, -2), 0, 0),
+    "Omega II":     ((0, 1, 1, 2, 2, 2, 1, 0, -1, -2), 0, 0),
+    "Zen":          ((-1, 1, 1, 2, 2, 2, 1, 0, 0, -2), 0, 0),
+    "Wong Halves":  ((-1, 0.5, 1, 1, 1.5, 1, 0.5, 0, -0.5, -1), 0, 0),
+    # Side count for the ace-neutral systems: aces seen
+    "Aces":         ((1, 0, 0, 0, 0, 0, 0, 0, 0, 0), 0, 0),
+}
+
+
+def register_system(name, tags, irc_per_deck=0, irc=0):
+    """Add a counting system from its 10 tags (Ace first, ten-valued last)."""
+    if len(tags) != 10:
+        raise ValueError("Counting systems need one tag per rank: A, 2-9, T")
+    SYSTEMS[name] = (tuple(tags), irc_per_deck, irc)
+
+
+# ------------- TRUE COUNT -------------
+# How the remaining decks are estimated when converting to a true count.
+
+def _exact_decks(cards_left):
+    return cards_left / 52.0
+
+
+def _half_deck_decks(cards_left):
+    return max(round(cards_left / 26.0) / 2.0, 0.5)
+
+
+def _full_deck_decks(cards_left):
+    return max(round(cards_left / 52.0), 1)
+
+
+TRUE_COUNT_METHODS = {
+    "exact": _exact_decks,
+    "half-deck": _half_deck_decks,
+    "full-deck": _full_deck_decks,
+}
+
+
+def true_count(running_count, cards_left, method="exact"):
+    """Running count divided by the remaining decks as estimated by `method`."""
+    if cards_left <= 0:
+        return 0
+    return running_count / TRUE_COUNT_METHODS[method](cards_left)
+
+
+class CardCounter:
+    """
+    Running counts for several systems at once.
+    systems: names from SYSTEMS, default all of them
+    method: true count conversion, one of TRUE_COUNT_METHODS
+    """
+    def __init__(self, systems=None, num_decks=8, method="exact"):
+        if method not in TRUE_COUNT_METHODS:
+            raise ValueError(f"Unknown true count method {method!r}")
+        self.systems = tuple(systems or SYSTEMS)
+        self.index = {name: i for i, name in enumerate(self.systems)}
+        self.num_decks = num_decks
+        self.method = method
+        tables = [SYSTEMS[name][0] for name in self.systems]
+        # Rank index -> tag of every tracked system
+        self.rank_tags = tuple(tuple(table[rank] for table in tables) for rank in range(10))
+        # Card code -> tag of every tracked system
+        self.code_tags = {}
+        for rank, index in RANK_INDEX.items():
+            self.code_tags[rank] = self.rank_tags[index]
+            for suit in 'HDCS':
+                self.code_tags[rank + suit] = self.rank_tags[index]
+        self.counts = ()
+        self.reset()
+
+    def reset(self):
+        """Start of a new shoe."""
+        self.counts = tuple(SYSTEMS[name][1] * self.num_decks + SYSTEMS[name][2] for name in self.systems)
+
+    def count(self, card):
+        """Count a card code like 'TS'."""
+        self.counts = tuple(map(add, self.counts, self.code_tags[card]))
+
+    def count_rank(self, rank):
+        """Count a card by rank index (Ace=0 ... ten-valued=9)."""
+        self.counts = tuple(map(add, self.counts, self.rank_tags[rank]))
+
+    def snapshot(self):
+        return self.counts
+
+    def restore(self, state):
+        self.counts = state
+
+    def running_count(self, system="Hi-Lo"):
+        return self.counts[self.index[system]]
+
+    def true_count(self, cards_left, system="Hi-Lo", method=None):
+        return true_count(self.counts[self.index[system]], cards_left, method or self.method)
+
+    def true_counts(self, cards_left, method=None):
+        """{system: true count} for every tracked system."""
+        decks = TRUE_COUNT_METHODS[method or self.method](cards_left) if cards_left > 0 else math.inf
+        return {name: count / decks for name, count in zip(self.systems, self.counts)}
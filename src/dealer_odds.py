@@ -0,0 +1,115 @@
+"""
+Dealer outcome odds for the live shoe.
+
+DealerOdds tracks the cards left in a shoe and gives the probabilities of
+the dealer finishing on 17, 18, 19, 20, 21 or busting for any upcard. Each
+upcard's odds are anchored to an exact ev.EVAnalyzer result and then moved
+card by card with the effect of removing that card, scaled to the cards
+left, so a dealt card costs a few dozen float adds. An upcard is re-anchored
+exactly when its odds are next asked for after `anchor_every` cards (fewer
+deeper into the shoe, where the drift is rougher) have gone by.
+"""
+from counting import RANK_INDEX
+from ev import EVAnalyzer, full_shoe, remove
+
+# Below this many cards left the odds are no longer re-anchored exactly
+MIN_ANCHOR_CARDS = 20
+
+# (decks, H17, peek) -> upcard -> per rank change in the outcome vector from
+# removing one card of that rank from a full shoe
+_EFFECTS = {}
+
+
+def removal_effects(analyzer, num_decks):
+    """Memoized per rank effects of removal off a full shoe, by upcard (Ace=1 ... ten-valued=10)."""
+    key = (num_decks, analyzer.rules['H17'], analyzer.peek)
+    effects = _EFFECTS.get(key)
+    if effects is None:
+        effects = {}
+        for upcard in range(1, 11):
+            comp = remove(full_shoe(num_decks), upcard)
+            base = analyzer.dealer_probs(upcard, comp)
+            effects[upcard] = [tuple(p - b for p, b in zip(analyzer.dealer_probs(upcard, remove(comp, value)), base))
+                               for value in range(1, 11)]
+        _EFFECTS[key] = effects
+    return effects
+
+
+class DealerOdds:
+    """
+    Pass as a shoe's counter to have it follow every dealt card, or feed it
+    with count/count_rank directly. Odds assume the dealer has peeked, as in
+    ev.EVAnalyzer.dealer_probs, unless peek is False; then an Ace or ten up
+    may still make blackjack, counted as 21.
+    """
+    def __init__(self, num_decks=8, h17=True, anchor_every=8, peek=True):
+        self.num_decks = num_decks
+        self.anchor_every = anchor_every
+        self.analyzer = EVAnalyzer({'H17': h17}, peek=peek)
+        self.effects = removal_effects(self.analyzer, num_decks)
+        # Effects are for one card out of a full shoe; deeper in they scale with 1 / cards left
+        self.effect_cards = 52 * num_decks - 1
+        self.reset()
+
+    def reset(self):
+        self.counts = list(full_shoe(self.num_decks))
+        self.left = sum(self.counts)
+        # upcard -> [exact odds at the anchor, cards dealt since, drift since]
+        self.anchors = {}
+        # Only full shoe odds are worth keeping across shoes
+        self.analyzer.clear_cache(keep=lambda upcard, comp: sum(comp) >= self.effect_cards)
+
+    def count(self, card):
+        self.count_rank(RANK_INDEX[card[0]])
+
+    def count_rank(self, rank):
+        """Take one card of `rank` (Ace=0 ... ten-valued=9) out of the shoe."""
+        scale = self.effect_cards / self.left
+        self.counts[rank] -= 1
+        self.left -= 1
+        for upcard, anchor in self.anchors.items():
+            drift = anchor[2]
+            effect = self.effects[upcard][rank]
+            for i in range(6):
+                drift[i] += effect[i] * scale
+            anchor[1] += 1
+
+    def snapshot(self):
+        return tuple(self.counts), self.left, {up: (a[0], a[1], tuple(a[2])) for up, a in self.anchors.items()}
+
+    def restore(self, state):
+        counts, self.left, anchors = state
+        self.counts = list(counts)
+        self.anchors = {up: [odds, dealt, list(drift)] for up, (odds, dealt, drift) in anchors.items()}
+
+    def anchor(self, upcard):
+        """Re-anchor `upcard`'s odds on the exact odds for the cards left."""
+        odds = self.analyzer.dealer_probs(upcard, tuple(self.counts))
+        anchor = self.anchors[upcard] = [odds, 0, [0.0] * 6]
+        return anchor
+
+    def probs(self, upcard, unseen=()):
+        """
+        Odds of the dealer finishing on 17, 18, 19, 20, 21 or busting with
+        `upcard` (Ace=1 ... ten-valued=10) showing.
+        unseen: card codes already dealt but not seen, like the dealer's hole
+        card; they are put back before the odds are taken
+        """
+        anchor = self.anchors.get(upcard)
+        stale = self.anchor_every * self.left / self.effect_cards
+        if anchor is None or (anchor[1] >= stale and self.left >= MIN_ANCHOR_CARDS):
+            anchor = self.anchor(upcard)
+        odds = [p + d for p, d in zip(anchor[0], anchor[2])]
+        left = self.left
+        for card in unseen:
+            scale = self.effect_cards / (left + 1)
+            left += 1
+            for i, e in enumerate(self.effects[upcard][RANK_INDEX[card[0]]]):
+                odds[i] -= e * scale
+        odds = [max(p, 0.0) for p in odds]
+        total = sum(odds)
+        return tuple(p / total for p in odds)
+
+    def stand_ev(self, total, upcard, unseen=()):
+        """EV of standing on `total` against `upcard`, from the live odds."""
+        return self.analyzer.stand_ev(total, self.probs(upcard, unseen))
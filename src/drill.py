@@ -0,0 +1,104 @@
+"""
+Count-speed drill: cards off a fresh shoe are flashed one at a time at a
+fixed rate, then the trainee gives the running or true count. Each drill's
+answer, response time and how well the flash rate was held are appended to
+a JSON lines log.
+"""
+import json
+import os
+import time
+
+from counting import CardCounter, SYSTEMS, TRUE_COUNT_METHODS
+from shoe import Shoe
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DRILL_LOG_PATH = os.path.join(BASE_DIR, "..", "data", "count_drills.jsonl")
+
+ASK = ("running", "true")
+# A true count answer within this of the exact value is right
+TRUE_COUNT_TOLERANCE = 0.5
+
+
+class CountDrill:
+    """
+    num_cards: cards flashed, at most one shoe
+    rate: cards per second
+    ask: "running" or "true"
+    """
+    def __init__(self, num_cards=52, rate=4.0, ask="running", system="Hi-Lo", num_decks=8,
+                 method="exact", rng=None):
+        if ask not in ASK:
+            raise ValueError(f"Drills ask for one of {', '.join(ASK)}")
+        if system not in SYSTEMS or method not in TRUE_COUNT_METHODS:
+            raise ValueError(f"Unknown system or true count method: {system}, {method}")
+        if rate <= 0:
+            raise ValueError("The rate must be positive")
+        self.rate = rate
+        self.ask = ask
+        self.system = system
+        self.method = method
+        # Never reshuffled mid-drill: a drill takes at most one shoe
+        self.shoe = Shoe(num_decks, reshuffle_pct=1.0, counter=CardCounter((system,), num_decks, method),
+                         true_count_method=method, rng=rng)
+        self.cards = self.shoe.deal_many(max(1, min(num_cards, self.shoe.cards_left())))
+
+    @property
+    def period(self):
+        """Seconds each card is shown."""
+        return 1.0 / self.rate
+
+    def expected(self):
+        counter = self.shoe.counter
+        if self.ask == "running":
+            return counter.running_count(self.system)
+        return counter.true_count(self.shoe.cards_left(), self.system)
+
+    def check(self, answer):
+        if self.ask == "running":
+            return answer == self.expected()
+        return abs(answer - self.expected()) <= TRUE_COUNT_TOLERANCE
+
+    def result(self, answer, latency, lateness=()):
+        """
+        Summary of a finished drill.
+        latency: seconds from the question to the answer
+        lateness: seconds each card was shown after its scheduled time; a
+        card late by half a period or more counts as dropped
+        """
+        lateness = list(lateness)
+        return {
+            "time": time.time(),
+            "cards": len(self.cards),
+            "rate": self.rate,
+            "system": self.system,
+            "ask": self.ask,
+            "method": self.method,
+            "answer": answer,
+            "expected": round(self.expected(), 2),
+            "correct": self.check(answer),
+            "latency": round(latency, 3),
+            "max_late_ms": round(max(lateness, default=0) * 1000, 2),
+            "dropped": sum(1 for late in lateness if late >= self.period / 2),
+            "seed": self.shoe.rng.seed,
+        }
+
+
+def log_result(result, path=DRILL_LOG_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def load_results(path=DRILL_LOG_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(results):
+    """(drills, accuracy, mean latency) over logged results."""
+    if not results:
+        return 0, 0.0, 0.0
+    n = len(results)
+    return n, sum(r["correct"] for r in results) / n, sum(r["latency"] for r in results) / n
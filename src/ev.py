@@ -0,0 +1,349 @@
+"""
+Combinatorial blackjack analysis.
+
+Dealer outcome probabilities are computed exactly for a shoe composition.
+Player EVs are composition-dependent on the player's starting hand: the
+dealer's odds come from the shoe after the upcard and the player's first two
+cards, and every later player draw comes out of the shoe exactly.
+Compositions are tuples of remaining cards per rank, Ace first and
+ten-valued cards last, and results are memoized on them.
+
+Rules: 3:2 blackjack, split aces get one card, up to 4 hands. The dealer
+peeks for blackjack unless the analyzer is made with peek=False, as in the
+trainer's game, where a dealer blackjack takes every doubled and split
+stake. Split hands are valued independently from the shoe left
+after the split.
+"""
+import sys
+
+# Rules not given default to the trainer's table, see blackjack.DEFAULT_RULES
+from blackjack import DEFAULT_RULES
+
+# Dealer outcome vector order
+OUTCOMES = (17, 18, 19, 20, 21, "bust")
+_STOOD = {total: tuple(1.0 if i == total - 17 else 0.0 for i in range(6)) for total in range(17, 22)}
+_BUST = (0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+MAX_HANDS = 4
+
+sys.setrecursionlimit(max(sys.getrecursionlimit(), 5000))
+
+
+def full_shoe(num_decks):
+    """Composition of a fresh shoe."""
+    return (4 * num_decks,) * 9 + (16 * num_decks,)
+
+
+def remove(comp, value):
+    """Composition with one card of `value` (Ace=1, ten-valued=10) taken out."""
+    i = value - 1
+    return comp[:i] + (comp[i] - 1,) + comp[i + 1:]
+
+
+def _total(hard, has_ace):
+    return hard + 10 if has_ace and hard <= 11 else hard
+
+
+class EVAnalyzer:
+    """Memoized dealer probabilities and player EVs for one rule set."""
+
+    def __init__(self, rules=None, peek=True):
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
+        self.peek = peek
+        self._dealer_memo = {}
+
+    # ------------- DEALER -------------
+
+    def dealer_probs(self, upcard, comp):
+        """
+        Probabilities of the dealer finishing on 17, 18, 19, 20, 21 or busting,
+        given the upcard and the shoe the hole card and hits come from.
+        With an Ace or ten up a peeking dealer doesn't have blackjack, so the
+        hole card cannot make it; without peek a blackjack counts as 21.
+        """
+        key = (upcard, comp)
+        probs = self._dealer_memo.get(key)
+        if probs is None:
+            probs = self._dealer_memo[key] = self._play_dealer(upcard, comp)
+        return probs
+
+    def clear_cache(self, keep=None):
+        """Drop memoized dealer odds, except those where keep(upcard, comp) is true."""
+        if keep is None:
+            self._dealer_memo.clear()
+        else:
+            self._dealer_memo = {key: probs for key, probs in self._dealer_memo.items() if keep(*key)}
+
+    def _play_dealer(self, upcard, comp):
+        h17 = self.rules['H17']
+        counts = list(comp)
+        # Dealer state is fully determined by the cards drawn so far, so the
+        # drawn multiset (packed into an int) is the memo key.
+        radix = max(counts) + 1
+        weights = [radix ** i for i in range(10)]
+        memo = {}
+
+        def draw(hard, has_ace, drawn, left, excluded=-1):
+            """Outcome vector after drawing one card to a dealer total that must hit."""
+            acc = [0.0] * 6
+            drawable = left - counts[excluded] if excluded >= 0 else left
+            for i in range(10):
+                count = counts[i]
+                if not count or i == excluded:
+                    continue
+                p = count / drawable
+                next_hard = hard + i + 1
+                next_ace = has_ace or i == 0
+                total = next_hard + 10 if next_ace and next_hard <= 11 else next_hard
+                if total > 21:
+                    acc[5] += p
+                elif total >= 17 and not (h17 and total == 17 and next_hard <= 11 and next_ace):
+                    acc[total - 17] += p
+                else:
+                    key = drawn + weights[i]
+                    sub = memo.get(key)
+                    if sub is None:
+                        counts[i] = count - 1
+                        sub = memo[key] = draw(next_hard, next_ace, key, left - 1)
+                        counts[i] = count
+                    acc[0] += p * sub[0]
+                    acc[1] += p * sub[1]
+                    acc[2] += p * sub[2]
+                    acc[3] += p * sub[3]
+                    acc[4] += p * sub[4]
+                    acc[5] += p * sub[5]
+            return acc
+
+        # Hole card, excluding the one that would make blackjack after a peek
+        excluded = -1
+        if self.peek:
+            excluded = 9 if upcard == 1 else (0 if upcard == 10 else -1)
+        return tuple(draw(upcard, upcard == 1, 0, sum(counts), excluded))
+
+    def dealer_blackjack_prob(self, upcard, comp):
+        """Chance the hole card makes blackjack."""
+        if upcard == 1:
+            return comp[9] / sum(comp)
+        if upcard == 10:
+            return comp[0] / sum(comp)
+        return 0.0
+
+    # ------------- PLAYER -------------
+
+    def stand_ev(self, total, dealer):
+        """EV of standing on `total` against a dealer_probs vector."""
+        if total > 21:
+            return -1.0
+        bust = dealer[5]
+        if total < 17:
+            return bust - (1.0 - bust)
+        win = bust + sum(dealer[:total - 17])
+        lose = sum(dealer[total - 16:5])
+        return win - lose
+
+    def can_double(self, hard, has_ace):
+        rule = self.rules['DOUBLE']
+        if rule == "9-11":
+            return _total(hard, has_ace) == hard and 9 <= hard <= 11
+        if rule == "10-11":
+            return _total(hard, has_ace) == hard and 10 <= hard <= 11
+        return True
+
+    def action_evs(self, cards, upcard, comp):
+        """
+        EV of each legal first decision for a player hand, assuming a
+        peeking dealer does not have blackjack.
+        cards: card values (Ace=1) in the player's hand
+        comp: shoe the next cards come from (player cards and upcard removed)
+        Returns a dict with 'Stand', 'Hit' and, where allowed, 'Double',
+        'Split' and 'Surrender'.
+        """
+        return dict(self.iter_action_evs(cards, upcard, comp))
+
+    def iter_action_evs(self, cards, upcard, comp, split=True, actions=None):
+        """
+        action_evs one decision at a time, as (action, EV) pairs. Split, by
+        far the slowest, comes last, so callers with a time budget can show
+        the rest first; split=False leaves it out.
+        actions: if given, only these are worked out
+        """
+        dealer = self.dealer_probs(upcard, comp)
+        blackjack = 0.0 if self.peek else self.dealer_blackjack_prob(upcard, comp)
+        solver = _HandSolver(self, comp, dealer, blackjack)
+        hard = sum(cards)
+        has_ace = 1 in cards
+        total = _total(hard, has_ace)
+        wanted = (lambda action: True) if actions is None else actions.__contains__
+        if wanted("Stand"):
+            yield "Stand", solver.stand[total]
+        if total < 21 and wanted("Hit"):
+            yield "Hit", solver.hit(hard, has_ace, 0)
+        if len(cards) == 2:
+            if self.can_double(hard, has_ace) and wanted("Double"):
+                yield "Double", solver.double(hard, has_ace)
+            if self.rules['LS'] and wanted("Surrender"):
+                # Without peek a dealer blackjack takes the whole bet
+                yield "Surrender", -0.5 - 0.5 * blackjack
+            if split and cards[0] == cards[1] and wanted("Split"):
+                yield "Split", 2.0 * solver.split_hand(cards[0], 0, 2)
+
+    # ------------- WHOLE GAME -------------
+
+    def round_ev(self, comp):
+        """Expected result of one round dealt from `comp`, in initial bets."""
+        left = sum(comp)
+        total_ev = 0.0
+        for up in range(1, 11):
+            if not comp[up - 1]:
+                continue
+            p_up = comp[up - 1] / left
+            comp_up = remove(comp, up)
+            left_up = left - 1
+            for c1 in range(1, 11):
+                if not comp_up[c1 - 1]:
+                    continue
+                p1 = comp_up[c1 - 1] / left_up
+                comp1 = remove(comp_up, c1)
+                for c2 in range(c1, 11):
+                    if not comp1[c2 - 1]:
+                        continue
+                    # Unordered pair: either card could have come first
+                    p2 = comp1[c2 - 1] / (left_up - 1)
+                    p = p_up * p1 * p2 * (1 if c1 == c2 else 2)
+                    total_ev += p * self.initial_ev(c1, c2, up, remove(comp1, c2))
+        return total_ev
+
+    def initial_ev(self, c1, c2, upcard, comp):
+        """EV of a two-card starting hand including dealer and player blackjacks."""
+        dealer_bj = self.dealer_blackjack_prob(upcard, comp)
+        if c1 + c2 == 11 and (c1 == 1 or c2 == 1):
+            return 1.5 * (1.0 - dealer_bj)
+        best = max(self.action_evs([c1, c2], upcard, comp).values())
+        if not self.peek:
+            # Dealer blackjacks are already in the action EVs
+            return best
+        return -dealer_bj + (1.0 - dealer_bj) * best
+
+    def house_edge(self, num_decks):
+        """House edge in percent for a fresh shoe of `num_decks` decks."""
+        return -100.0 * self.round_ev(full_shoe(num_decks))
+
+
+class _HandSolver:
+    """
+    Player recursion for one starting position. `dealer` is the dealer_probs
+    vector for the shoe when the player's first two cards were dealt; later
+    player draws come out of the shoe exactly but don't move the dealer's
+    odds. Cards drawn since the start are packed into an int (`drawn`),
+    which with the hand total is the memo key. `blackjack` is the chance of
+    an unpeeked dealer blackjack, which beats a drawn 21 rather than pushing.
+    """
+
+    def __init__(self, analyzer, comp, dealer, blackjack=0.0):
+        self.analyzer = analyzer
+        self.rules = analyzer.rules
+        self.dealer = dealer
+        self.counts = list(comp)
+        self.left = sum(comp)
+        radix = max(comp) + 1
+        self.weights = [radix ** i for i in range(10)]
+        self.stand = [analyzer.stand_ev(total, dealer) for total in range(23)]
+        self.stand[21] -= blackjack
+        self.memo = {}
+        self.split_memo = {}
+
+    def hit_stand(self, hard, has_ace, drawn):
+        """Best of hitting or standing from here."""
+        total = hard + 10 if has_ace and hard <= 11 else hard
+        if total > 21:
+            return -1.0
+        key = (hard, has_ace, drawn)
+        ev = self.memo.get(key)
+        if ev is None:
+            ev = self.stand[total]
+            if total < 21:
+                hit = self.hit(hard, has_ace, drawn)
+                if hit > ev:
+                    ev = hit
+            self.memo[key] = ev
+        return ev
+
+    def hit(self, hard, has_ace, drawn):
+        counts = self.counts
+        weights = self.weights
+        memo = self.memo
+        stand = self.stand
+        left = self.left
+        self.left = left - 1
+        ev = 0.0
+        for i in range(10):
+            count = counts[i]
+            if not count:
+                continue
+            next_hard = hard + i + 1
+            next_ace = has_ace or i == 0
+            total = next_hard + 10 if next_ace and next_hard <= 11 else next_hard
+            if total > 21:
+                ev -= count
+            elif total == 21:
+                ev += count * stand[21]
+            else:
+                best = memo.get((next_hard, next_ace, drawn + weights[i]))
+                if best is None:
+                    counts[i] = count - 1
+                    best = self.hit_stand(next_hard, next_ace, drawn + weights[i])
+                    counts[i] = count
+                ev += count * best
+        self.left = left
+        return ev / left
+
+    def double(self, hard, has_ace):
+        counts = self.counts
+        stand = self.stand
+        ev = 0.0
+        for i in range(10):
+            if counts[i]:
+                ev += counts[i] * stand[min(_total(hard + i + 1, has_ace or i == 0), 22)]
+        return 2.0 * ev / self.left
+
+    def split_hand(self, pair, drawn, hands):
+        """EV of one hand started from a split `pair` card."""
+        key = (pair, drawn, hands)
+        ev = self.split_memo.get(key)
+        if ev is not None:
+            return ev
+        rules = self.rules
+        can_double = self.analyzer.can_double
+        can_resplit = hands < MAX_HANDS and (pair != 1 or rules['RSA'])
+        counts = self.counts
+        left = self.left
+        self.left = left - 1
+        ev = 0.0
+        for i in range(10):
+            count = counts[i]
+            if not count:
+                continue
+            value = i + 1
+            counts[i] = count - 1
+            next_drawn = drawn + self.weights[i]
+            hard, has_ace = pair + value, pair == 1 or value == 1
+            if pair == 1:
+                best = self.stand[_total(hard, has_ace)]
+            else:
+                best = self.hit_stand(hard, has_ace, next_drawn)
+                if rules['DAS'] and can_double(hard, has_ace):
+                    best = max(best, self.double(hard, has_ace))
+            if value == pair and can_resplit:
+                best = max(best, 2.0 * self.split_hand(pair, next_drawn, hands + 1))
+            counts[i] = count
+            ev += count * best
+        self.left = left
+        ev /= left
+        self.split_memo[key] = ev
+        return ev
+
+
+def house_edge(rules, num_decks):
+    """House edge in percent for a rule set and number of decks."""
+    return EVAnalyzer(rules).house_edge(num_decks)
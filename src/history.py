@@ -0,0 +1,234 @@
+"""
+Append-only binary hand history.
+
+A file is a 16 byte header followed by one fixed-width 128 byte record per
+round, so record i starts at HEADER_SIZE + i * RECORD_SIZE and a reader can
+mmap the file and index it directly.
+
+Record layout (little-endian):
+    uint32   round number
+    float32  initial bet
+    float32  net result of the round
+    int16    running count when the bet was placed
+    int16    true count * 100 when the bet was placed
+    uint8    number of player hands
+    uint8    number of decisions
+    uint8    flags (FLAG_*)
+    10 x uint8   dealer cards
+    4 x 8 x uint8  player cards, 8 slots per hand
+    4 x uint8    hand results: outcome | DOUBLED | BUSTED
+    12 x (uint8 hand << 4 | action, int16 running count, int16 true count * 100)
+    3 pad bytes
+Cards are indexes into shoe.CARD_CODES; empty slots are NO_CARD. Hands,
+cards or decisions past the fixed slots are dropped and FLAG_TRUNCATED set.
+"""
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+from shoe import CARD_CODES
+
+MAGIC = b"BJH1"
+VERSION = 1
+HEADER = struct.Struct("<4sHH8x")
+HEADER_SIZE = HEADER.size
+
+MAX_DEALER_CARDS = 10
+MAX_HANDS = 4
+MAX_HAND_CARDS = 8
+MAX_DECISIONS = 12
+RECORD = struct.Struct("<IffhhBBB%ds%ds%ds%s3x" % (
+    MAX_DEALER_CARDS, MAX_HANDS * MAX_HAND_CARDS, MAX_HANDS, "Bhh" * MAX_DECISIONS))
+RECORD_SIZE = RECORD.size
+
+NO_CARD = 0xFF
+CARD_INDEX = {code: i for i, code in enumerate(CARD_CODES)}
+
+ACTIONS = ("", "Hit", "Stand", "Double", "Split", "Surrender")
+ACTION_CODES = {name: i for i, name in enumerate(ACTIONS) if name}
+
+LOSE, PUSH, WIN, BLACKJACK, SURRENDER = range(5)
+OUTCOMES = ("lose", "push", "win", "blackjack", "surrender")
+DOUBLED = 0x08
+BUSTED = 0x10
+
+FLAG_TRUNCATED = 0x01
+FLAG_DEALER_BLACKJACK = 0x02
+
+Round = namedtuple("Round", "number bet net running_count true_count dealer hands results decisions flags")
+Decision = namedtuple("Decision", "hand action running_count true_count")
+
+
+def _clamp16(value):
+    return max(-32768, min(32767, int(round(value))))
+
+
+def _cards(cards, slots):
+    packed = bytes(CARD_INDEX[card] for card in cards[:slots])
+    return packed + bytes([NO_CARD]) * (slots - len(packed))
+
+
+def pack_round(number, bet, net, running_count, true_count, dealer, hands, results, decisions, flags=0):
+    """
+    Pack one round into a RECORD_SIZE bytes record.
+    dealer: card codes; hands: list of card code lists
+    results: per hand outcome | DOUBLED | BUSTED
+    decisions: (hand index, action name, running count, true count) tuples
+    """
+    if (len(dealer) > MAX_DEALER_CARDS or len(hands) > MAX_HANDS or len(decisions) > MAX_DECISIONS
+            or any(len(cards) > MAX_HAND_CARDS for cards in hands)):
+        flags |= FLAG_TRUNCATED
+    hands = hands[:MAX_HANDS]
+    player = b"".join(_cards(cards, MAX_HAND_CARDS) for cards in hands)
+    player += bytes([NO_CARD]) * (MAX_HANDS * MAX_HAND_CARDS - len(player))
+    decision_fields = []
+    for hand, action, running, tc in decisions[:MAX_DECISIONS]:
+        decision_fields += (hand << 4 | ACTION_CODES[action], _clamp16(running), _clamp16(tc * 100))
+    decision_fields += (0, 0, 0) * (MAX_DECISIONS - len(decisions[:MAX_DECISIONS]))
+    return RECORD.pack(number & 0xFFFFFFFF, bet, net, _clamp16(running_count), _clamp16(true_count * 100),
+                       len(hands), min(len(decisions), MAX_DECISIONS), flags,
+                       _cards(dealer, MAX_DEALER_CARDS), player, bytes(results[:MAX_HANDS]).ljust(MAX_HANDS, b"\0"),
+                       *decision_fields)
+
+
+def unpack_round(fields):
+    """Round from the fields of one RECORD.unpack."""
+    number, bet, net, running, tc, num_hands, num_decisions, flags, dealer, player, results = fields[:11]
+    decisions = fields[11:]
+    hands = [[CARD_CODES[card] for card in player[i * MAX_HAND_CARDS:(i + 1) * MAX_HAND_CARDS] if card != NO_CARD]
+             for i in range(num_hands)]
+    return Round(
+        number, bet, net, running, tc / 100,
+        [CARD_CODES[card] for card in dealer if card != NO_CARD],
+        hands,
+        list(results[:num_hands]),
+        [Decision(decisions[i] >> 4, ACTIONS[decisions[i] & 0x0F], decisions[i + 1], decisions[i + 2] / 100)
+         for i in range(0, 3 * num_decisions, 3)],
+        flags,
+    )
+
+
+class HandHistoryWriter:
+    """
+    Appends round records to `path`, writing the header for a new file.
+    Records are buffered and written every `flush_every` rounds.
+    """
+    def __init__(self, path, flush_every=4096):
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer = []
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "ab")
+        size = self.file.tell()
+        if size == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+            size = HEADER_SIZE
+        else:
+            _check_header(path)
+        self.rounds = (size - HEADER_SIZE) // RECORD_SIZE
+        # Drop a partial last record left by an interrupted flush, so new
+        # records start on a record boundary
+        if size != HEADER_SIZE + self.rounds * RECORD_SIZE:
+            self.file.truncate(HEADER_SIZE + self.rounds * RECORD_SIZE)
+
+    def write(self, *fields, **kwargs):
+        """Append one round; arguments as for pack_round without the round number."""
+        self.buffer.append(pack_round(self.rounds, *fields, **kwargs))
+        self.rounds += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(b"".join(self.buffer))
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_header(path):
+    with open(path, "rb") as f:
+        magic, version, record_size = HEADER.unpack(f.read(HEADER_SIZE))
+    if magic != MAGIC or record_size != RECORD_SIZE:
+        raise ValueError(f"{path} is not a version {VERSION} hand history file")
+
+
+class HandHistory:
+    """
+    Read-only view of a hand history file through mmap. Indexing and
+    iteration decode records on demand; records() yields raw field tuples
+    and array() gives a NumPy structured view for whole-file scans.
+    """
+    def __init__(self, path):
+        _check_header(path)
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = (size - HEADER_SIZE) // RECORD_SIZE
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return unpack_round(RECORD.unpack_from(self.map, HEADER_SIZE + i * RECORD_SIZE))
+
+    def records(self):
+        """Raw RECORD field tuples, straight from the mapped file."""
+        if not self.count:
+            return iter(())
+        view = memoryview(self.map)[HEADER_SIZE:HEADER_SIZE + self.count * RECORD_SIZE]
+        return RECORD.iter_unpack(view)
+
+    def __iter__(self):
+        return map(unpack_round, self.records())
+
+    def array(self):
+        """Every record as a NumPy structured array backed by the mapped file."""
+        import numpy as np
+        if not self.count:
+            return np.zeros(0, dtype=record_dtype())
+        return np.frombuffer(self.map, dtype=record_dtype(), count=self.count, offset=HEADER_SIZE)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record_dtype():
+    """NumPy dtype matching RECORD."""
+    import numpy as np
+    decision = np.dtype([("hand_action", "u1"), ("running_count", "<i2"), ("true_count", "<i2")])
+    return np.dtype([
+        ("number", "<u4"), ("bet", "<f4"), ("net", "<f4"),
+        ("running_count", "<i2"), ("true_count", "<i2"),
+        ("num_hands", "u1"), ("num_decisions", "u1"), ("flags", "u1"),
+        ("dealer", "u1", MAX_DEALER_CARDS),
+        ("hands", "u1", (MAX_HANDS, MAX_HAND_CARDS)),
+        ("results", "u1", MAX_HANDS),
+        ("decisions", decision, MAX_DECISIONS),
+        ("pad", "V3"),
+    ])
@@ -1,50 +1,51 @@
+import argparse
 import sys
 import os
+import json
+import threading
+import time
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QLabel, QPushButton, QLineEdit, QHBoxLayout,
-    QVBoxLayout, QWidget, QMessageBox, QSpinBox
+    QVBoxLayout, QWidget, QMessageBox, QSpinBox, QComboBox, QDialog, QDoubleSpinBox
 )
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
-from PyQt5.QtSvg import QSvgRenderer
-from PyQt5.QtGui import QImage
-from PyQt5.QtGui import QPainter
-
-from blackjack import BlackjackGame, hand_value
-from strategy import should_split, should_double_down, best_move_soft, best_move_hard, check_playing_deviations
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+
+from blackjack import BlackjackGame, card_value, hand_value
+from history import HandHistoryWriter
+from card_atlas import AtlasBuilder, card_png, load_atlas, sprite_rect
+from counting import SYSTEMS
+from dealer_odds import DealerOdds
+from drill import CountDrill, load_results, log_result, summarize
+from ev import EVAnalyzer
+from strategy import best_move, deviation_set_names, ramp_bet, DEFAULT_DEVIATION_SET
+from basic_strategy import computed_chart
+from shoe import Shoe
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
 
-CARD_PATH = os.path.join(PROJECT_ROOT, "assets", "svg-cards")
-
-
-def code_to_filename(card_code):
-    rank_map = {
-        'A': 'ace',
-        '2': '2',
-        '3': '3',
-        '4': '4',
-        '5': '5',
-        '6': '6',
-        '7': '7',
-        '8': '8',
-        '9': '9',
-        'T': '10',
-        'J': 'jack',
-        'Q': 'queen',
-        'K': 'king',
-    }
-    suit_map = {
-        'C': 'clubs',
-        'D': 'diamonds',
-        'H': 'hearts',
-        'S': 'spades',
-    }
-    rank = rank_map[card_code[0]]
-    suit = suit_map[card_code[1]]
-    return f"{rank}_of_{suit}.svg"
+PNG_PATH = os.path.join(PROJECT_ROOT, "assets", "png")
+
+# Where --history records every round played in the trainer by default
+HISTORY_PATH = os.path.join(PROJECT_ROOT, "data", "hand_history.bjh")
+
+# Written by helpers/bet_ramp.py --save
+RAMP_PATH = os.path.join(PROJECT_ROOT, "data", "bet_ramp.json")
+
+# Action EVs are worked out on the GUI thread for at most one frame, the rest in an EVWorker
+EV_FRAME_BUDGET = 0.016
+
+
+def load_bet_ramp(path=RAMP_PATH):
+    """Saved {true count: bet} ramp, or None if none has been saved."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return {int(tc): bet for tc, bet in json.load(f)["ramp"].items()}
+
 
 def move_to_str(move):
     return {
@@ -54,40 +55,317 @@ def move_to_str(move):
         "Split": "Split",
     }.get(move, move)
 
-def svg_to_pixmap(svg_path, width=70, height=105):
-    if not os.path.exists(svg_path):
-        # Fallback: transparent pixmap
-        image = QImage(width, height, QImage.Format_ARGB32)
-        image.fill(Qt.transparent)
-        return QPixmap.fromImage(image)
-    renderer = QSvgRenderer(svg_path)
-    image = QImage(width, height, QImage.Format_ARGB32)
-    image.fill(Qt.transparent)
-    painter = QPixmap(image)
-    painter = QPixmap(width, height)
-    painter.fill(Qt.transparent)
-    svg_renderer = QSvgRenderer(svg_path)
-    painter_obj = QPainter(painter)
-    svg_renderer.render(painter_obj)
-    painter_obj.end()
-    return painter
-
-def get_card_pixmap(card_code):
-    filename = code_to_filename(card_code)
-    path = os.path.join(CARD_PATH, filename)
-    return svg_to_pixmap(path, 70, 105)
-
-def get_card_back_pixmap():
-    path = os.path.join(CARD_PATH, "back.svg")
-    return svg_to_pixmap(path, 70, 105)
+# Card atlases as QPixmaps, keyed by (width, height, device pixel ratio)
+_atlases = {}
+
+# Cards sliced from an atlas, keyed by (card code or "back", width, height, device pixel ratio).
+# Least recently used entries are dropped once several sizes are in use.
+PIXMAP_CACHE_SIZE = 256
+_pixmap_cache = OrderedDict()
+
+def _device_pixel_ratio():
+    app = QApplication.instance()
+    return app.devicePixelRatio() if app is not None else 1.0
+
+def install_atlas(width, height, dpr, image):
+    """Use a card atlas QImage for cards of this size from now on."""
+    _atlases[(width, height, dpr)] = QPixmap.fromImage(image)
+    for cache_key in [k for k in _pixmap_cache if k[1:] == (width, height, dpr)]:
+        del _pixmap_cache[cache_key]
+
+def _fallback_pixmap(key, width, height, dpr):
+    """Scaled bundled PNG, shown until the atlas for this size is built."""
+    path = os.path.join(PNG_PATH, "back.png") if key == "back" else card_png(key)
+    pixmap = QPixmap(path)
+    if pixmap.isNull():
+        pixmap = QPixmap(round(width * dpr), round(height * dpr))
+        pixmap.fill(Qt.transparent)
+    else:
+        pixmap = pixmap.scaled(round(width * dpr), round(height * dpr), Qt.IgnoreAspectRatio,
+                               Qt.SmoothTransformation)
+    pixmap.setDevicePixelRatio(dpr)
+    return pixmap
+
+def cached_pixmap(key, width, height):
+    dpr = _device_pixel_ratio()
+    cache_key = (key, width, height, dpr)
+    pixmap = _pixmap_cache.get(cache_key)
+    if pixmap is None:
+        atlas = _atlases.get((width, height, dpr))
+        if atlas is None:
+            # Not cached, so the atlas version replaces it once it's ready
+            return _fallback_pixmap(key, width, height, dpr)
+        pixmap = atlas.copy(sprite_rect(key, round(width * dpr), round(height * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        _pixmap_cache[cache_key] = pixmap
+        if len(_pixmap_cache) > PIXMAP_CACHE_SIZE:
+            _pixmap_cache.popitem(last=False)
+    else:
+        _pixmap_cache.move_to_end(cache_key)
+    return pixmap
+
+def get_card_pixmap(card_code, width=70, height=105):
+    return cached_pixmap(card_code[:2], width, height)
+
+def get_card_back_pixmap(width=70, height=105):
+    return cached_pixmap("back", width, height)
+
+class CardRow:
+    """A row of card labels in an QHBoxLayout that ends in a stretch, updated in place."""
+    def __init__(self, layout):
+        self.layout = layout
+        self.labels = []
+        self.keys = []  # card code or "back" shown by each label
+
+    def set_cards(self, keys):
+        for i, key in enumerate(keys):
+            if i == len(self.labels):
+                lbl = QLabel()
+                self.layout.insertWidget(i, lbl, alignment=Qt.AlignLeft)
+                self.labels.append(lbl)
+                self.keys.append(None)
+            if self.keys[i] != key:
+                self.labels[i].setPixmap(get_card_back_pixmap() if key == "back" else get_card_pixmap(key))
+                self.keys[i] = key
+        while len(self.labels) > len(keys):
+            lbl = self.labels.pop()
+            self.keys.pop()
+            self.layout.removeWidget(lbl)
+            lbl.deleteLater()
+
+    def refresh(self):
+        """Fetch every card's pixmap again, e.g. once the atlas is ready."""
+        keys = self.keys
+        self.keys = [None] * len(keys)
+        self.set_cards(keys)
+
+class HandView:
+    """Title, value and cards of one player hand."""
+    def __init__(self):
+        self.widget = QWidget()
+        vbox = QVBoxLayout(self.widget)
+        vbox.setContentsMargins(0, 0, 0, 0)
+        self.title_label = QLabel()
+        self.value_label = QLabel()
+        hbox = QHBoxLayout()
+        hbox.addStretch(1)
+        vbox.addWidget(self.title_label)
+        vbox.addWidget(self.value_label)
+        vbox.addLayout(hbox)
+        self.card_row = CardRow(hbox)
+
+    def update(self, title, value_text, cards):
+        if self.title_label.text() != title:
+            self.title_label.setText(title)
+        if self.value_label.text() != value_text:
+            self.value_label.setText(value_text)
+        self.card_row.set_cards(cards)
+
+class EVWorker(QThread):
+    """
+    Works out the action EVs that don't fit in a frame, on its own no-peek
+    EVAnalyzer. Only the latest position asked for is worked on: a newer
+    request takes over between actions. `evaluated` is delivered on the GUI
+    thread.
+    """
+    evaluated = pyqtSignal(object, str, float)
+
+    def __init__(self, rules, parent=None):
+        super().__init__(parent)
+        self.analyzer = EVAnalyzer(rules, peek=False)
+        self.wake = threading.Condition()
+        self.pending = None
+        self.stopping = False
+
+    def request(self, position, actions):
+        """position: (player card values, upcard, shoe composition)"""
+        with self.wake:
+            self.pending = (position, actions)
+            self.wake.notify()
+
+    def stop(self):
+        with self.wake:
+            self.stopping = True
+            self.wake.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.wake:
+                while self.pending is None and not self.stopping:
+                    self.wake.wait()
+                if self.stopping:
+                    return
+                (position, actions), self.pending = self.pending, None
+            cards, upcard, comp = position
+            for action, ev in self.analyzer.iter_action_evs(list(cards), upcard, comp, actions=actions):
+                if self.pending is not None or self.stopping:
+                    break
+                self.evaluated.emit(position, action, ev)
+
+
+class CountDrillDialog(QDialog):
+    """
+    Flashes a drill's cards on one label at a fixed rate, then asks for the
+    count. Every pixmap is fetched before the first card, and each card is
+    scheduled from the drill's start time rather than the previous card,
+    so timer jitter never accumulates into a slower rate.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Count Drill")
+        self.drill = None
+        self.pixmaps = []
+        self.index = 0
+        self.lateness = []
+        self.start_time = 0.0
+        self.asked_at = 0.0
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.next_card)
+
+        self.cards_input = QSpinBox()
+        self.cards_input.setRange(1, 416)
+        self.cards_input.setValue(52)
+        self.rate_input = QDoubleSpinBox()
+        self.rate_input.setRange(0.5, 60)
+        self.rate_input.setValue(4)
+        self.rate_input.setSuffix(" cards/s")
+        self.ask_input = QComboBox()
+        self.ask_input.addItems(["Running count", "True count"])
+        self.system_input = QComboBox()
+        self.system_input.addItems(list(SYSTEMS))
+        settings_box = QHBoxLayout()
+        for label, widget in (("Cards:", self.cards_input), ("Rate:", self.rate_input),
+                              ("Ask:", self.ask_input), ("System:", self.system_input)):
+            settings_box.addWidget(QLabel(label))
+            settings_box.addWidget(widget)
+
+        self.card_label = QLabel()
+        self.card_label.setFixedSize(70, 105)
+        self.progress_label = QLabel()
+        card_box = QHBoxLayout()
+        card_box.addStretch(1)
+        card_box.addWidget(self.card_label)
+        card_box.addStretch(1)
+
+        self.start_button = QPushButton("Start")
+        self.start_button.clicked.connect(self.start)
+        self.answer_input = QDoubleSpinBox()
+        self.answer_input.setRange(-416, 416)
+        self.answer_input.setDecimals(1)
+        self.answer_button = QPushButton("Answer")
+        self.answer_button.clicked.connect(self.answer)
+        answer_box = QHBoxLayout()
+        answer_box.addWidget(self.start_button)
+        answer_box.addStretch(1)
+        answer_box.addWidget(self.answer_input)
+        answer_box.addWidget(self.answer_button)
+
+        self.result_label = QLabel()
+        layout = QVBoxLayout(self)
+        layout.addLayout(settings_box)
+        layout.addLayout(card_box)
+        layout.addWidget(self.progress_label)
+        layout.addLayout(answer_box)
+        layout.addWidget(self.result_label)
+        self.set_answering(False)
+        self.show_summary()
+
+    def set_answering(self, answering):
+        self.answer_input.setEnabled(answering)
+        self.answer_button.setEnabled(answering)
+        self.answer_button.setDefault(answering)
+
+    def start(self):
+        ask = "running" if self.ask_input.currentIndex() == 0 else "true"
+        self.drill = CountDrill(self.cards_input.value(), self.rate_input.value(), ask,
+                                self.system_input.currentText())
+        self.pixmaps = [get_card_pixmap(card) for card in self.drill.cards]
+        self.index = 0
+        self.lateness = []
+        self.start_button.setEnabled(False)
+        self.set_answering(False)
+        self.result_label.setText("")
+        self.start_time = time.perf_counter()
+        self.next_card()
+
+    def next_card(self):
+        now = time.perf_counter()
+        if self.index == len(self.pixmaps):
+            self.card_label.clear()
+            self.ask()
+            return
+        self.lateness.append(now - (self.start_time + self.index * self.drill.period))
+        self.card_label.setPixmap(self.pixmaps[self.index])
+        # Paint now, so the card is up as close to its slot as possible
+        self.card_label.repaint()
+        self.index += 1
+        self.progress_label.setText(f"{self.index} / {len(self.pixmaps)}")
+        due = self.start_time + self.index * self.drill.period
+        self.timer.start(max(0, round((due - time.perf_counter()) * 1000)))
+
+    def ask(self):
+        question = "running count" if self.drill.ask == "running" else f"true count ({self.drill.system})"
+        self.progress_label.setText(f"What's the {question}?")
+        self.answer_input.setValue(0)
+        self.set_answering(True)
+        self.answer_input.setFocus()
+        self.answer_input.selectAll()
+        self.asked_at = time.perf_counter()
+
+    def answer(self):
+        result = self.drill.result(self.answer_input.value(), time.perf_counter() - self.asked_at, self.lateness)
+        log_result(result)
+        verdict = "Correct!" if result["correct"] else f"Wrong, it was {result['expected']:g}."
+        timing = f"Answered in {result['latency']:.1f}s."
+        if result["dropped"]:
+            timing += f" {result['dropped']} card(s) shown late, max {result['max_late_ms']:.0f} ms."
+        self.result_label.setText(f"{verdict} {timing}")
+        self.set_answering(False)
+        self.start_button.setEnabled(True)
+        self.show_summary()
+
+    def show_summary(self):
+        drills, accuracy, latency = summarize(load_results())
+        if drills:
+            self.progress_label.setText(f"{drills} drills: {accuracy:.0%} correct, {latency:.1f}s average answer")
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
 
 class BlackjackWindow(QMainWindow):
-    def __init__(self):
+    """history_path: hand history file every round is appended to; None records nothing."""
+    def __init__(self, history_path=None):
         super().__init__()
         self.setWindowTitle("Casino Blackjack Trainer")
         self.resize(700, 850)
-        self.game = BlackjackGame()
+        # The dealer's odds follow the shoe card by card
+        self.dealer_odds = DealerOdds(8, peek=False)
+        self.history = HandHistoryWriter(history_path, flush_every=1) if history_path else None
+        self.game = BlackjackGame(shoe=Shoe(counter=self.dealer_odds), history=self.history)
         self.count_visible = True
+        self.deviation_set = DEFAULT_DEVIATION_SET
+        self.chart = None  # hand-typed charts
+        # The game doesn't peek, so EVs and odds count the dealer's blackjacks
+        self.ev_analyzer = EVAnalyzer(self.game.rules, peek=False)
+        self.ev_worker = EVWorker(self.game.rules, self)
+        self.ev_worker.evaluated.connect(self.action_evaluated)
+        self.ev_worker.start()
+        # A window dropped without being closed still stops its worker first
+        self.destroyed.connect(self.ev_worker.stop)
+        # Position the action EVs are for; EVs still coming in for another one are dropped
+        self.ev_position = None
+        # Whether the message label shows the action EVs, so late ones may update it
+        self.ev_shown = False
+        self.best_move_text = ""
+        self.action_evs = {}
+        self.pending_actions = []
+        self.bet_ramp = load_bet_ramp()
+        self.load_card_atlas()
         self.init_ui()
         self.update_ui()
 
@@ -109,15 +387,23 @@ class BlackjackWindow(QMainWindow):
         # Dealer
         self.dealer_label = QLabel("Dealer:")
         self.dealer_cards = QHBoxLayout()
+        self.dealer_cards.addStretch(1)
+        self.dealer_card_row = CardRow(self.dealer_cards)
         self.dealer_value_label = QLabel()
+        self.dealer_odds_label = QLabel()
         dealer_box = QVBoxLayout()
         dealer_box.addWidget(self.dealer_label)
         dealer_box.addLayout(self.dealer_cards)
         dealer_box.addWidget(self.dealer_value_label)
+        dealer_box.addWidget(self.dealer_odds_label)
 
         # Player
         self.player_label = QLabel("Your Hand(s):")
         self.player_hands_layout = QVBoxLayout()
+        # Hand views are kept between updates, two per row
+        self.hand_views = []
+        self.hand_rows = []
+        self.player_value_labels = []
         player_box = QVBoxLayout()
         player_box.addWidget(self.player_label)
         player_box.addLayout(self.player_hands_layout)
@@ -134,6 +420,8 @@ class BlackjackWindow(QMainWindow):
         bet_box.addWidget(QLabel("Bet:"))
         bet_box.addWidget(self.bet_input)
         bet_box.addWidget(self.bet_button)
+        self.suggested_bet_label = QLabel()
+        bet_box.addWidget(self.suggested_bet_label)
 
         self.sitout_button = QPushButton("Sit Out")
         self.sitout_button.clicked.connect(self.sit_out)
@@ -154,6 +442,15 @@ class BlackjackWindow(QMainWindow):
         self.best_move_button.clicked.connect(self.show_best_move)
         self.check_count_button = QPushButton("Check Count")
         self.check_count_button.clicked.connect(self.show_count)
+        self.count_drill_button = QPushButton("Count Drill")
+        self.count_drill_button.clicked.connect(self.open_count_drill)
+        self.deviation_set_input = QComboBox()
+        self.deviation_set_input.addItems(deviation_set_names())
+        self.deviation_set_input.setCurrentText(self.deviation_set)
+        self.deviation_set_input.currentTextChanged.connect(self.set_deviation_set)
+        self.chart_input = QComboBox()
+        self.chart_input.addItems(["Hand-typed", "Computed for table rules"])
+        self.chart_input.currentIndexChanged.connect(self.set_chart)
 
         action_box = QHBoxLayout()
         action_box.addWidget(self.hit_button)
@@ -164,7 +461,12 @@ class BlackjackWindow(QMainWindow):
         bottom_action_box = QHBoxLayout()
         bottom_action_box.addWidget(self.best_move_button)
         bottom_action_box.addWidget(self.check_count_button)
-        bottom_action_box.addStretch(1) 
+        bottom_action_box.addWidget(self.count_drill_button)
+        bottom_action_box.addStretch(1)
+        bottom_action_box.addWidget(QLabel("Deviations:"))
+        bottom_action_box.addWidget(self.deviation_set_input)
+        bottom_action_box.addWidget(QLabel("Chart:"))
+        bottom_action_box.addWidget(self.chart_input)
 
         # Message
         self.message_label = QLabel()
@@ -185,6 +487,7 @@ class BlackjackWindow(QMainWindow):
         self.setCentralWidget(central)
 
     def update_ui(self):
+        self.ev_shown = False
         # Balance and shoe
         self.balance_label.setText(f"Balance: ${self.game.balance}")
         self.cards_left_label.setText(f"Cards Remaining: {self.game.shoe.cards_left()}")
@@ -193,28 +496,21 @@ class BlackjackWindow(QMainWindow):
         running = self.game.shoe.get_running_count()
         true = self.game.shoe.get_true_count()
         self.count_label.setText(f"Running: {running}   True: {true:.2f}")
+        if self.bet_ramp:
+            suggested = min(max(ramp_bet(self.bet_ramp, true), self.game.min_bet), self.game.max_bet)
+            self.suggested_bet_label.setText(f"Suggested: ${suggested:g}")
+        self.suggested_bet_label.setVisible(bool(self.bet_ramp) and self.count_visible
+                                            and not self.game.in_progress)
 
         # Dealer cards
-        # Clear dealer card layout completely (widgets and stretches)
-        for i in reversed(range(self.dealer_cards.count())):
-            item = self.dealer_cards.itemAt(i)
-            widget = item.widget()
-            if widget:
-                widget.setParent(None)
-            else:
-                self.dealer_cards.removeItem(item)
-
         dealer_hand = self.game.dealer_hand
-        for idx, card in enumerate(dealer_hand):
-            lbl = QLabel()
-            if idx == 1 and self.game.in_progress:
-                lbl.setPixmap(get_card_back_pixmap())
-            else:
-                lbl.setPixmap(get_card_pixmap(card))
-            self.dealer_cards.addWidget(lbl, alignment=Qt.AlignLeft)
-        self.dealer_cards.addStretch(1)
+        self.dealer_card_row.set_cards([
+            "back" if idx == 1 and self.game.in_progress else card
+            for idx, card in enumerate(dealer_hand)
+        ])
 
         # Dealer hand value
+        self.dealer_odds_label.setVisible(self.count_visible and self.game.in_progress)
         if not dealer_hand:
             self.dealer_value_label.setText("")
         else:
@@ -222,47 +518,27 @@ class BlackjackWindow(QMainWindow):
                 visible = dealer_hand[:1]
                 val, _ = hand_value(visible)
                 self.dealer_value_label.setText(f"Dealer shows: {val}")
+                # The hole card is dealt but unseen, so it goes back into the odds
+                odds = self.dealer_odds.probs(card_value(dealer_hand[0]), unseen=dealer_hand[1:2])
+                self.dealer_odds_label.setText("Dealer odds:  " + "   ".join(
+                    f"{outcome}: {p:.0%}" for outcome, p in zip(("17", "18", "19", "20", "21", "Bust"), odds)))
             else:
                 val, _ = hand_value(dealer_hand)
                 self.dealer_value_label.setText(f"Dealer: {val}")
 
-        self.clear_layout(self.player_hands_layout)
-        self.player_value_labels = []
-
         # Show each hand with value
         hands = self.game.player_hands
         num_hands = len(hands)
-        i = 0
-        while i < num_hands:
-            row_layout = QHBoxLayout()
-            for j in range(2):
-                if i + j < num_hands:
-                    hand = hands[i + j]
-                    vbox = QVBoxLayout()
-                    hbox = QHBoxLayout()
-                    for card in hand.cards:
-                        lbl = QLabel()
-                        lbl.setPixmap(get_card_pixmap(card))
-                        hbox.addWidget(lbl)
-                    hbox.addStretch(1)
-                    # Hand label
-                    if num_hands > 1:
-                        label = QLabel(f"Hand {i + j + 1} (Bet: ${hand.bet})" + (" (Active)" if i + j == self.game.current_hand_index else ""))
-                    else:
-                        label = QLabel(f"Your Hand (Bet: ${hand.bet})")
-                    vbox.addWidget(label)
-                    # Hand value label
-                    val = hand.value()
-                    soft = hand.is_soft()
-                    handtype = "soft" if soft else "hard"
-                    val_label = QLabel(f"Value: {val} ({handtype})")
-                    vbox.addWidget(val_label)
-                    self.player_value_labels.append(val_label)
-                    vbox.addLayout(hbox)
-                    row_layout.addLayout(vbox)
-            row_layout.addStretch(1)
-            self.player_hands_layout.addLayout(row_layout)
-            i += 2
+        self.resize_hand_views(num_hands)
+        for i, (hand, view) in enumerate(zip(hands, self.hand_views)):
+            # Hand label
+            if num_hands > 1:
+                title = f"Hand {i + 1} (Bet: ${hand.bet})" + (" (Active)" if i == self.game.current_hand_index else "")
+            else:
+                title = f"Your Hand (Bet: ${hand.bet})"
+            # Hand value label
+            handtype = "soft" if hand.is_soft() else "hard"
+            view.update(title, f"Value: {hand.value()} ({handtype})", hand.cards)
 
         # Enable/disable controls
         if not self.game.in_progress:
@@ -278,8 +554,8 @@ class BlackjackWindow(QMainWindow):
             hand = self.game.get_current_hand()
             self.hit_button.setEnabled(not hand.finished)
             self.stand_button.setEnabled(not hand.finished)
-            self.double_button.setEnabled(hand.can_double() and not hand.finished and self.game.balance >= hand.bet)
-            self.split_button.setEnabled(hand.can_split() and not hand.finished and self.game.balance >= hand.bet)
+            self.double_button.setEnabled(self.game.can_double(hand) and not hand.finished)
+            self.split_button.setEnabled(self.game.can_split(hand) and not hand.finished)
         self.best_move_button.setEnabled(self.game.in_progress)
         self.message_label.setText(self.game.message)
 
@@ -314,11 +590,60 @@ class BlackjackWindow(QMainWindow):
         hand = self.game.get_current_hand()
         move, is_deviation = self.get_best_move_for_hand(hand)
         if is_deviation:
-            self.message_label.setText(
-                f"Deviation Move!\nBest move: {move}\n(Card counting deviation)"
-            )
+            self.best_move_text = f"Deviation Move!\nBest move: {move}\n(Card counting deviation)"
         else:
-            self.message_label.setText(f"Best move: {move}")
+            self.best_move_text = f"Best move: {move}"
+        self.show_action_evs(hand)
+
+    def show_action_evs(self, hand):
+        """Add the EV of each legal action against the cards left to the best move message."""
+        self.ev_shown = True
+        upcard = card_value(self.game.dealer_hand[0])
+        # Cards left, with the unseen hole card put back
+        comp = list(self.dealer_odds.counts)
+        comp[card_value(self.game.dealer_hand[1]) - 1] += 1
+        cards = [card_value(card) for card in hand.cards]
+        self.pending_actions = ["Stand", "Hit"] if hand.value() < 21 else ["Stand"]
+        if self.game.can_double(hand):
+            self.pending_actions.append("Double")
+        if self.game.can_surrender(hand):
+            self.pending_actions.append("Surrender")
+        if self.game.can_split(hand):
+            self.pending_actions.append("Split")
+        position = (tuple(cards), upcard, tuple(comp))
+        # Asked again for the same position: the EVs are done or still on their way
+        if position != self.ev_position:
+            self.ev_position = position
+            self.action_evs = {}
+            actions = self.ev_analyzer.iter_action_evs(cards, upcard, position[2], actions=self.pending_actions)
+            deadline = time.perf_counter() + EV_FRAME_BUDGET
+            for action, ev in actions:
+                self.action_evs[action] = ev
+                remaining = [a for a in self.pending_actions if a not in self.action_evs]
+                # Splitting takes the longest by far, so it never holds up the GUI thread
+                if remaining and (remaining[0] == "Split" or time.perf_counter() > deadline):
+                    self.ev_worker.request(position, remaining)
+                    break
+        self.show_best_move_text()
+
+    def action_evaluated(self, position, action, ev):
+        if position == self.ev_position:
+            self.action_evs[action] = ev
+            if self.ev_shown:
+                self.show_best_move_text()
+
+    def show_best_move_text(self):
+        best = max(self.action_evs.values(), default=0.0)
+        cells = []
+        for action in self.pending_actions:
+            ev = self.action_evs.get(action)
+            if ev is None:
+                cells.append(f"{action}: ...")
+            elif ev == best:
+                cells.append(f"{action}: {ev:+.3f}")
+            else:
+                cells.append(f"{action}: {ev:+.3f} ({ev - best:+.3f})")
+        self.message_label.setText(self.best_move_text + "\nEV per initial bet:  " + "   ".join(cells))
 
     def check_hand_end(self):
         hand = self.game.get_current_hand()
@@ -354,61 +679,82 @@ class BlackjackWindow(QMainWindow):
     def show_count(self):
         self.count_visible = not self.count_visible
         self.count_label.setVisible(self.count_visible)
+        self.update_ui()
+
+    def open_count_drill(self):
+        CountDrillDialog(self).exec_()
+
+    def resize_hand_views(self, count):
+        """Add or remove hand views so there is one per player hand."""
+        while len(self.hand_views) < count:
+            i = len(self.hand_views)
+            if i // 2 == len(self.hand_rows):
+                row_layout = QHBoxLayout()
+                row_layout.addStretch(1)
+                self.player_hands_layout.addLayout(row_layout)
+                self.hand_rows.append(row_layout)
+            view = HandView()
+            self.hand_rows[i // 2].insertWidget(i % 2, view.widget)
+            self.hand_views.append(view)
+        while len(self.hand_views) > count:
+            view = self.hand_views.pop()
+            row_layout = self.hand_rows[len(self.hand_views) // 2]
+            row_layout.removeWidget(view.widget)
+            view.widget.deleteLater()
+            if len(self.hand_views) % 2 == 0:
+                self.hand_rows.pop()
+                self.player_hands_layout.removeItem(row_layout)
+                row_layout.deleteLater()
+        self.player_value_labels = [view.value_label for view in self.hand_views]
+
+    def load_card_atlas(self, width=70, height=105):
+        """Install the cached card atlas, or build it in the background and show the PNGs meanwhile."""
+        dpr = _device_pixel_ratio()
+        self.atlas_builder = None
+        image = load_atlas(width, height, dpr)
+        if image is not None:
+            install_atlas(width, height, dpr, image)
+        else:
+            self.atlas_builder = AtlasBuilder(width, height, dpr, self)
+            self.atlas_builder.built.connect(self.atlas_built)
+            self.atlas_builder.start()
+
+    def closeEvent(self, event):
+        # The builder thread must not outlive the window that owns it
+        if self.atlas_builder is not None:
+            self.atlas_builder.wait()
+        self.ev_worker.stop()
+        if self.history is not None:
+            self.history.close()
+            self.history = self.game.history = None
+        super().closeEvent(event)
+
+    def atlas_built(self, width, height, dpr, image):
+        install_atlas(width, height, dpr, image)
+        self.dealer_card_row.refresh()
+        for view in self.hand_views:
+            view.card_row.refresh()
 
-    def clear_layout(self, layout):
-        while layout.count():
-            item = layout.takeAt(0)
-            widget = item.widget()
-            child_layout = item.layout()
-            if widget is not None:
-                widget.deleteLater()
-            elif child_layout is not None:
-                self.clear_layout(child_layout)
-    
     def get_best_move_for_hand(self, hand):
         dealer_card = self.game.dealer_hand[0]
         true_count = self.game.shoe.get_true_count()
+        return best_move(hand.cards, dealer_card, true_count,
+                         can_double=self.game.can_double(hand), can_split=self.game.can_split(hand),
+                         deviation_set=self.deviation_set, chart=self.chart)
 
-        deviation_move = check_playing_deviations(hand.cards, dealer_card, true_count)
-        if deviation_move:
-            return deviation_move, True  # True = deviation
-
-        move = None
+    def set_deviation_set(self, name):
+        self.deviation_set = name
 
-        # Pair?
-        if hand.can_split():
-            if should_split(hand.cards, dealer_card):
-                move = "Split"
-            else:
-                move = None
-
-        val, is_soft = hand_value(hand.cards)
-        if move is None:
-            if is_soft and val != 21:
-                best = best_move_soft(hand.cards, dealer_card)
-                if best == "S":
-                    move = "Stand"
-                elif best == "H":
-                    move = "Hit"
-                elif best == "D" or best == "Ds":
-                    if hand.can_double() and self.game.balance >= hand.bet:
-                        move = "Double"
-                    else:
-                        move = "Hit" if best == "D" else "Stand"
-            else:
-                best = best_move_hard(hand.cards, dealer_card)
-                if best == "S":
-                    move = "Stand"
-                elif best == "H":
-                    move = "Hit"
-                elif best == "D":
-                    if hand.can_double() and self.game.balance >= hand.bet:
-                        move = "Double"
-                    else:
-                        move = "Hit"
-        if move is None:
-            move = "Stand" if val >= 17 else "Hit"
-        return move, False
+    def set_chart(self, index):
+        if index == 0:
+            self.chart = None
+            return
+        # Computed once per rule set, then read from the cache
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.chart = computed_chart(self.game.rules, self.game.shoe.num_decks)
+        finally:
+            QApplication.restoreOverrideCursor()
         
     def sit_out(self):
         # Start a round, but don't deduct or settle bet, player does nothing
@@ -501,7 +847,12 @@ class BlackjackWindow(QMainWindow):
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = BlackjackWindow()
+    parser = argparse.ArgumentParser(description="Casino blackjack trainer")
+    parser.add_argument("--history", nargs="?", const=HISTORY_PATH, default=None,
+                        help=f"record every round to this hand history file (default {HISTORY_PATH})")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = BlackjackWindow(args.history)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Seedable shuffle streams for the shoes.
+
+Every shoe shuffled from a ShuffleStream gets its own generator, derived
+from the stream's seed, key and the shoe's number, so shoe n of a run can
+be replayed on its own from (seed, key, n). spawn() hands out independent
+streams for parallel workers.
+
+With NumPy the generators are PCG64 seeded through SeedSequence and the
+shuffle is one vectorized permutation of the shoe's int buffer. Without
+NumPy the same seeds drive random.Random, so runs still reproduce, just
+not bit-for-bit with the NumPy ones.
+"""
+import hashlib
+import random
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _fresh_seed():
+    if np is not None:
+        return np.random.SeedSequence().entropy
+    return random.SystemRandom().getrandbits(128)
+
+
+class ShuffleStream:
+    """
+    seed: int, or None to draw a fresh one (kept in .seed so the run can be replayed)
+    key: tuple of ints separating streams that share a seed, see spawn()
+    """
+    def __init__(self, seed=None, key=()):
+        self.seed = _fresh_seed() if seed is None else seed
+        self.key = tuple(key)
+        self.shoe_number = 0  # next shoe to shuffle
+
+    def generator(self, shoe_number):
+        """The generator for one shoe of this stream."""
+        if np is not None:
+            sequence = np.random.SeedSequence(self.seed, spawn_key=self.key + (shoe_number,))
+            return np.random.Generator(np.random.PCG64(sequence))
+        digest = hashlib.sha256(repr((self.seed, self.key, shoe_number)).encode()).digest()
+        return random.Random(int.from_bytes(digest[:16], "little"))
+
+    def shuffle(self, cards):
+        """Shuffle the next shoe in place: an array('B') of card ints or a list."""
+        gen = self.generator(self.shoe_number)
+        self.shoe_number += 1
+        if np is None:
+            gen.shuffle(cards)
+        elif isinstance(cards, array):
+            gen.shuffle(np.frombuffer(cards, dtype=np.uint8))
+        else:
+            cards[:] = [cards[i] for i in gen.permutation(len(cards)).tolist()]
+
+    def spawn(self, n):
+        """`n` independent streams, e.g. one per worker process."""
+        return [ShuffleStream(self.seed, self.key + (0x5EED, i)) for i in range(n)]
+
+    def state(self):
+        """(seed, key, next shoe number), enough to rebuild this stream."""
+        return self.seed, self.key, self.shoe_number
+
+
+def as_stream(rng):
+    """A ShuffleStream from a ShuffleStream, an int seed or None."""
+    return rng if isinstance(rng, ShuffleStream) else ShuffleStream(rng)
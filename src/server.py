@@ -0,0 +1,426 @@
+"""
+Headless trainer service: many independent training sessions, each a
+BlackjackGame with its own shoe, served from one asyncio process.
+
+Plain HTTP/1.1 with keep-alive, JSON in and out:
+    POST   /sessions                      new session {"balance", "min_bet", "max_bet", "decks",
+                                          "penetration", "rules", "deviation_set", "seed"}
+    GET    /sessions/<id>                 table state
+    DELETE /sessions/<id>
+    POST   /sessions/<id>/bet             {"amount": 25}
+    POST   /sessions/<id>/hit             also stand, double, split, surrender
+    GET    /sessions/<id>/best-move
+    GET    /sessions/<id>/count
+    GET    /                              server info
+
+GET /ws upgrades to a WebSocket taking the same calls as JSON text
+messages, {"action": "hit", "session": "<id>", ...}, one reply per message.
+Any "id" in a message is echoed back in its reply.
+
+Playing moves are applied and graded against the session's strategy: the
+reply says whether the move was the recommended one, like the trainer.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import secrets
+import struct
+import time
+
+from blackjack import BlackjackGame, DEFAULT_RULES, hand_value
+from shoe import ArrayShoe
+from strategy import best_move, deviation_set_names, DEFAULT_DEVIATION_SET
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+MOVES = {
+    "hit": ("Hit", BlackjackGame.player_hit),
+    "stand": ("Stand", BlackjackGame.player_stand),
+    "double": ("Double", BlackjackGame.player_double),
+    "split": ("Split", BlackjackGame.player_split),
+    "surrender": ("Surrender", BlackjackGame.player_surrender),
+}
+
+
+def _hand_state(hand, active):
+    return {"cards": hand.cards, "value": hand.value(), "soft": hand.is_soft(), "bet": hand.bet,
+            "doubled": hand.doubled, "finished": hand.finished, "busted": hand.is_bust(),
+            "surrendered": hand.surrendered, "active": active}
+
+
+class Session:
+    """One trainee's game. Only the game, a few settings and the last settlement are kept."""
+    __slots__ = ("id", "game", "deviation_set", "last_seen", "results")
+
+    def __init__(self, session_id, game, deviation_set=DEFAULT_DEVIATION_SET):
+        self.id = session_id
+        self.game = game
+        self.deviation_set = deviation_set
+        self.last_seen = time.monotonic()
+        self.results = None
+
+    def recommended(self):
+        """(move, is_deviation) for the current hand, as the trainer's Best Move."""
+        game = self.game
+        hand = game.get_current_hand()
+        return best_move(hand.cards, game.dealer_hand[0], game.shoe.get_true_count(),
+                         can_double=game.can_double(hand), can_split=game.can_split(hand),
+                         can_surrender=game.can_surrender(hand), deviation_set=self.deviation_set)
+
+    def bet(self, amount):
+        game = self.game
+        if game.in_progress:
+            raise ValueError("A round is already in progress.")
+        balance = game.balance
+        self.results = None
+        if not game.start_round(amount):
+            raise ValueError(game.message)
+        if not game.in_progress:
+            # Blackjack, settled on the deal
+            self.results = [game.balance - balance]
+
+    def move(self, action):
+        """Apply a playing move. Returns (recommended move, is_deviation)."""
+        game = self.game
+        if not game.in_progress:
+            raise ValueError("No hand in progress.")
+        name, apply = MOVES[action]
+        hand = game.get_current_hand()
+        allowed = {"Double": game.can_double, "Split": game.can_split, "Surrender": game.can_surrender}
+        if name in allowed and not allowed[name](hand):
+            raise ValueError(f"Can't {action} this hand.")
+        recommended = self.recommended()
+        apply(game)
+        if game.get_current_hand().finished:
+            game.advance_hand()
+            if game.all_player_hands_finished():
+                self.finish_round()
+        return recommended
+
+    def finish_round(self):
+        game = self.game
+        game.play_dealer()
+        self.results = [payout - hand.bet for hand, (payout, _) in zip(game.player_hands, game.settle_bets())]
+
+    def count(self):
+        shoe = self.game.shoe
+        return {"running_count": shoe.get_running_count(), "true_count": round(shoe.get_true_count(), 2),
+                "cards_left": shoe.cards_left()}
+
+    def state(self):
+        game = self.game
+        dealer = game.dealer_hand
+        if game.in_progress and dealer:
+            dealer = [dealer[0], None]
+            dealer_value = hand_value(dealer[:1])[0]
+        else:
+            dealer_value = hand_value(dealer)[0] if dealer else None
+        return {
+            "session": self.id,
+            "balance": game.balance,
+            "in_progress": game.in_progress,
+            "dealer": dealer,
+            "dealer_value": dealer_value,
+            "hands": [_hand_state(hand, game.in_progress and i == game.current_hand_index)
+                      for i, hand in enumerate(game.player_hands)],
+            "results": self.results,
+            "message": game.message,
+            "cards_left": game.shoe.cards_left(),
+        }
+
+
+class TrainerService:
+    """
+    The sessions and the calls on them, independent of the transport.
+    Sessions idle for longer than `idle_timeout` seconds are dropped.
+    """
+    def __init__(self, max_sessions=1000, idle_timeout=3600):
+        self.sessions = {}
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.calls = 0
+
+    def create(self, balance=10000, min_bet=10, max_bet=1000, decks=8, penetration=0.8, rules=None,
+               deviation_set=DEFAULT_DEVIATION_SET, seed=None):
+        if len(self.sessions) >= self.max_sessions:
+            self.expire()
+            if len(self.sessions) >= self.max_sessions:
+                raise ValueError("Too many sessions.")
+        if deviation_set not in deviation_set_names():
+            raise ValueError(f"Unknown deviation set: {deviation_set}")
+        unknown = set(rules or {}) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}")
+        decks, penetration = int(decks), float(penetration)
+        if not 1 <= decks <= 8:
+            raise ValueError("decks must be 1 to 8")
+        if not 0 < penetration < 1:
+            raise ValueError("penetration must be between 0 and 1")
+        if not 0 < min_bet <= max_bet:
+            raise ValueError("Bets must have 0 < min_bet <= max_bet")
+        if balance < 0:
+            raise ValueError("balance can't be negative")
+        shoe = ArrayShoe(decks, penetration, rng=seed)
+        game = BlackjackGame(balance, min_bet, max_bet, shoe=shoe, rules=rules)
+        session_id = secrets.token_hex(8)
+        session = self.sessions[session_id] = Session(session_id, game, deviation_set)
+        return session
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise LookupError(f"No session {session_id}")
+        session.last_seen = time.monotonic()
+        return session
+
+    def expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [s.id for s in self.sessions.values() if s.last_seen < cutoff]:
+            del self.sessions[session_id]
+
+    def call(self, action, session_id=None, params=None):
+        """
+        Run one call and return its reply. Bad calls raise ValueError,
+        unknown sessions or actions LookupError.
+        """
+        params = params or {}
+        self.calls += 1
+        if action == "info":
+            return {"sessions": len(self.sessions), "calls": self.calls, "deviation_sets": deviation_set_names()}
+        if action == "create":
+            return self.create(**params).state()
+        session = self.get(session_id)
+        if action == "state":
+            return session.state()
+        if action == "close":
+            del self.sessions[session.id]
+            return {"session": session.id, "closed": True}
+        if action == "bet":
+            if "amount" not in params:
+                raise ValueError("bet needs an amount")
+            session.bet(params["amount"])
+            return session.state()
+        if action in MOVES:
+            move, is_deviation = session.move(action)
+            reply = session.state()
+            reply["feedback"] = {"move": MOVES[action][0], "recommended": move, "deviation": is_deviation,
+                                 "correct": move == MOVES[action][0]}
+            return reply
+        if action == "best-move":
+            if not session.game.in_progress:
+                raise ValueError("No hand in progress.")
+            move, is_deviation = session.recommended()
+            return {"move": move, "deviation": is_deviation}
+        if action == "count":
+            return session.count()
+        raise LookupError(f"Unknown action {action}")
+
+
+class MethodNotAllowed(Exception):
+    pass
+
+
+# Calls that only read the session; every other session call changes it and must be POSTed
+READS = ("best-move", "count")
+
+
+def _route(method, path):
+    """(action, session id) for an HTTP request."""
+    parts = [part for part in path.split("?")[0].split("/") if part]
+    if not parts:
+        return "info", None
+    if parts[0] != "sessions" or len(parts) > 3:
+        raise LookupError(f"No route {path}")
+    if len(parts) == 1:
+        actions, session_id = {"GET": "info", "POST": "create"}, None
+    elif len(parts) == 2:
+        actions, session_id = {"GET": "state", "DELETE": "close"}, parts[1]
+    else:
+        actions, session_id = {"GET" if parts[2] in READS else "POST": parts[2]}, parts[1]
+    if method not in actions:
+        raise MethodNotAllowed(f"{method} not allowed on {path}")
+    return actions[method], session_id
+
+
+def _reply(call, *args):
+    """(status, JSON body) for a service call."""
+    try:
+        return 200, call(*args)
+    except LookupError as e:
+        return 404, {"error": str(e).strip("'")}
+    except (ValueError, TypeError) as e:
+        return 400, {"error": str(e)}
+
+
+class TrainerServer:
+    """asyncio HTTP + WebSocket front end for a TrainerService."""
+    def __init__(self, service=None, host="127.0.0.1", port=8765):
+        self.service = service or TrainerService()
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        # Port 0 picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            while True:
+                await asyncio.sleep(min(self.service.idle_timeout, 60))
+                self.service.expire()
+
+    def close(self):
+        self.server.close()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("upgrade", "").lower() == "websocket":
+                    if "sec-websocket-key" in headers:
+                        await self.websocket(reader, writer, headers)
+                    else:
+                        self.respond(writer, 400, {"error": "Missing Sec-WebSocket-Key"}, close=True)
+                    break
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    self.respond(writer, 413, {"error": "Request too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    params = json.loads(body) if body else {}
+                    action, session_id = _route(method, path)
+                except ValueError:
+                    status, reply = 400, {"error": "Body must be JSON"}
+                except LookupError as e:
+                    status, reply = 404, {"error": str(e)}
+                except MethodNotAllowed as e:
+                    status, reply = 405, {"error": str(e)}
+                else:
+                    status, reply = _reply(self.service.call, action, session_id, params)
+                close = headers.get("connection", "").lower() == "close"
+                self.respond(writer, status, reply, close)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def respond(writer, status, reply, close=False):
+        body = json.dumps(reply).encode()
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n"
+                     % (status, REASONS[status].encode(), len(body), b"Connection: close\r\n" if close else b"")
+                     + body)
+
+    async def websocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        while True:
+            opcode, payload = await read_frame(reader)
+            if opcode == 0x8:  # close
+                writer.write(frame(payload[:2], 0x8))
+                await writer.drain()
+                return
+            if opcode == 0x9:  # ping
+                writer.write(frame(payload, 0xA))
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                message = json.loads(payload)
+                params = dict(message)
+            except (ValueError, TypeError):
+                writer.write(frame(json.dumps({"error": "Message must be a JSON object"}).encode()))
+                continue
+            message_id = params.pop("id", None)
+            action = params.pop("action", "info")
+            session_id = params.pop("session", None)
+            status, reply = _reply(self.service.call, action, session_id, params)
+            if status != 200:
+                reply["status"] = status
+            if message_id is not None:
+                reply["id"] = message_id
+            writer.write(frame(json.dumps(reply).encode()))
+            await writer.drain()
+
+
+async def read_frame(reader):
+    """(opcode, payload) of the next WebSocket frame, joining fragments."""
+    opcode, payload = None, b""
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack("!Q", await reader.readexactly(8))
+        if length > MAX_BODY:
+            raise ValueError("WebSocket frame too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        data = await reader.readexactly(length)
+        if mask:
+            data = bytes(b ^ mask[i & 3] for i, b in enumerate(data))
+        if first & 0x0F:
+            opcode = first & 0x0F
+        payload += data
+        if first & 0x80:
+            return opcode, payload
+
+
+def frame(payload, opcode=0x1, mask=False):
+    """One final WebSocket frame. Clients must mask, the server must not."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length | (0x80 if mask else 0))
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126 | (0x80 if mask else 0), length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127 | (0x80 if mask else 0), length)
+    if not mask:
+        return header + payload
+    key = secrets.token_bytes(4)
+    return header + key + bytes(b ^ key[i & 3] for i, b in enumerate(payload))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless blackjack trainer service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--idle-timeout", type=float, default=3600, help="seconds before an idle session is dropped")
+    args = parser.parse_args()
+
+    server = TrainerServer(TrainerService(args.max_sessions, args.idle_timeout), args.host, args.port)
+
+    async def main():
+        await server.start()
+        print(f"Trainer service on http://{server.host}:{server.port}  (WebSocket at /ws)")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,9 +1,30 @@
-import random
+from array import array
+
+from counting import RANK_INDEX, SYSTEMS, true_count
+from rng import as_stream
+
+# Hi-Lo tag per card code, and per rank character
+_HILO = {rank: SYSTEMS["Hi-Lo"][0][index] for rank, index in RANK_INDEX.items()}
+_HILO.update({rank + suit: tag for rank, tag in list(_HILO.items()) for suit in 'HDCS'})
+
 
 class Shoe:
-    def __init__(self, num_decks=8, reshuffle_pct=0.8):
+    """
+    counter: optional counting.CardCounter fed every dealt card, for
+    tracking other systems alongside the Hi-Lo running count, or anything
+    else with its reset/count/count_rank/snapshot/restore methods, like
+    dealer_odds.DealerOdds
+    true_count_method: how get_true_count estimates the decks left, see
+    counting.TRUE_COUNT_METHODS
+    rng: rng.ShuffleStream or int seed for the shuffles; None seeds a fresh
+    stream, whose seed is kept in rng.seed
+    """
+    def __init__(self, num_decks=8, reshuffle_pct=0.8, counter=None, true_count_method="exact", rng=None):
         self.num_decks = num_decks
         self.reshuffle_pct = reshuffle_pct
+        self.counter = counter
+        self.true_count_method = true_count_method
+        self.rng = as_stream(rng)
         self.cards = []
         self.discards = []
         self.running_count = 0
@@ -15,19 +36,17 @@ class Shoe:
                       for rank in 'A23456789TJQK'
                       for suit in 'HDCS'
                       for _ in range(self.num_decks)]
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
         self.discards = []
         self.running_count = 0
+        if self.counter is not None:
+            self.counter.reset()
     
     def count_card(self, card):
         """Update the running count based on the card dealt."""
-        rank = card[0]
-        # Hi-Lo system
-        if rank in '23456':
-            self.running_count += 1
-        elif rank in 'TJQKA':
-            self.running_count -= 1
-        # 7,8,9 = 0
+        self.running_count += _HILO[card]
+        if self.counter is not None:
+            self.counter.count(card)
 
     def deal(self):
         """Deal one card. If shoe is low, reshuffle."""
@@ -38,6 +57,17 @@ class Shoe:
         self.count_card(card)
         return card
 
+    def deal_many(self, n):
+        """Deal `n` cards at once, in dealing order. Reshuffles first if the shoe is low."""
+        if self.needs_reshuffle() or n > len(self.cards):
+            self.reshuffle()
+        cards = self.cards[-n:][::-1]
+        del self.cards[-n:]
+        self.discards.extend(cards)
+        for card in cards:
+            self.count_card(card)
+        return cards
+
     def cards_left(self):
         return len(self.cards)
 
@@ -47,8 +77,152 @@ class Shoe:
     def get_running_count(self):
         return self.running_count
 
+    def replay(self, shoe_number):
+        """Reshuffle into exactly the `shoe_number`-th shoe (from 0) of this shoe's stream."""
+        self.rng.shoe_number = shoe_number
+        self.reshuffle()
+
+    def snapshot(self):
+        """
+        State to restore() the shoe to, without copying the cards: the card
+        lists only ever move cards from one to the other, and a reshuffle
+        replaces them instead of refilling them.
+        """
+        counter = self.counter.snapshot() if self.counter is not None else None
+        return (self.cards, self.discards, len(self.discards), self.running_count,
+                self.rng.shoe_number, counter)
+
+    def restore(self, state):
+        """Put the shoe back as it was at snapshot(); costs one move per card dealt since."""
+        cards, discards, dealt, self.running_count, self.rng.shoe_number, counter = state
+        extra = len(discards) - dealt
+        if extra > 0:
+            cards.extend(reversed(discards[dealt:]))
+            del discards[dealt:]
+        elif extra < 0:
+            # Restoring forward, past an earlier restore
+            moved = cards[extra:][::-1]
+            del cards[extra:]
+            discards.extend(moved)
+        self.cards = cards
+        self.discards = discards
+        if counter is not None:
+            self.counter.restore(counter)
+
+    def get_true_count(self):
+        return true_count(self.running_count, len(self.cards), self.true_count_method)
+
+
+RANKS = 'A23456789TJQK'
+SUITS = 'HDCS'
+# Card ints 0-51 map to codes rank-major: 0='AH', 1='AD', ... 51='KS'
+CARD_CODES = tuple(rank + suit for rank in RANKS for suit in SUITS)
+# Index into the per-rank counts for each card int (Ace=0, 2-9, ten-valued=9)
+CARD_RANK = tuple(min(card // 4, 9) for card in range(52))
+HILO_TAGS = tuple(SYSTEMS["Hi-Lo"][0][CARD_RANK[card]] for card in range(52))
+
+
+class ArrayShoe:
+    """
+    Drop-in alternative to Shoe that keeps the cards as small ints in an
+    array and deals from a cursor instead of popping a list of strings.
+    rank_counts holds the cards left per rank (Ace=0 ... ten-valued=9).
+    counter, true_count_method and rng are as for Shoe.
+    """
+    def __init__(self, num_decks=8, reshuffle_pct=0.8, counter=None, true_count_method="exact", rng=None):
+        self.num_decks = num_decks
+        self.reshuffle_pct = reshuffle_pct
+        self.counter = counter
+        self.true_count_method = true_count_method
+        self.rng = as_stream(rng)
+        # Unshuffled order; every shoe is shuffled from here so it can be replayed alone
+        self.ordered = array('B', range(52)) * num_decks
+        self.buffer = array('B', self.ordered)
+        self.pos = 0
+        self.cut = 0
+        self.rank_counts = []
+        self.running_count = 0
+        self.reshuffle()
+
+    def reshuffle(self):
+        """Shuffle all cards back into the shoe."""
+        self.buffer[:] = self.ordered
+        self.rng.shuffle(self.buffer)
+        self.pos = 0
+        # Deal past this index and the shoe gets reshuffled
+        self.cut = len(self.buffer) - (1 - self.reshuffle_pct) * self.num_decks * 52
+        self.rank_counts = [4 * self.num_decks] * 9 + [16 * self.num_decks]
+        self.running_count = 0
+        if self.counter is not None:
+            self.counter.reset()
+
+    def deal(self):
+        """Deal one card. If shoe is low, reshuffle."""
+        if self.pos > self.cut:
+            self.reshuffle()
+        card = self.buffer[self.pos]
+        self.pos += 1
+        rank = CARD_RANK[card]
+        self.rank_counts[rank] -= 1
+        self.running_count += HILO_TAGS[card]
+        if self.counter is not None:
+            self.counter.count_rank(rank)
+        return CARD_CODES[card]
+
+    def deal_many(self, n):
+        """Deal `n` cards at once, in dealing order. Reshuffles first if the shoe is low."""
+        if self.pos > self.cut or self.pos + n > len(self.buffer):
+            self.reshuffle()
+        start = self.pos
+        self.pos = start + n
+        cards = self.buffer[start:start + n]
+        rank_counts = self.rank_counts
+        running_count = self.running_count
+        for card in cards:
+            rank_counts[CARD_RANK[card]] -= 1
+            running_count += HILO_TAGS[card]
+        self.running_count = running_count
+        if self.counter is not None:
+            for card in cards:
+                self.counter.count_rank(CARD_RANK[card])
+        return [CARD_CODES[card] for card in cards]
+
+    @property
+    def discards(self):
+        return [CARD_CODES[card] for card in self.buffer[:self.pos]]
+
+    def cards_left(self):
+        return len(self.buffer) - self.pos
+
+    def needs_reshuffle(self):
+        return self.pos > self.cut
+
+    def get_running_count(self):
+        return self.running_count
+
+    def replay(self, shoe_number):
+        """Reshuffle into exactly the `shoe_number`-th shoe (from 0) of this shoe's stream."""
+        self.rng.shoe_number = shoe_number
+        self.reshuffle()
+
+    def snapshot(self):
+        """State to restore() the shoe to: the cursor and counts, not the cards."""
+        counter = self.counter.snapshot() if self.counter is not None else None
+        return self.pos, tuple(self.rank_counts), self.running_count, self.rng.shoe_number, counter
+
+    def restore(self, state):
+        """
+        Put the shoe back as it was at snapshot(). Within the same shoe this
+        only moves the cursor; across a reshuffle the old shoe is replayed.
+        """
+        pos, rank_counts, running_count, shoe_number, counter = state
+        if self.rng.shoe_number != shoe_number:
+            self.replay(shoe_number - 1)
+        self.pos = pos
+        self.rank_counts = list(rank_counts)
+        self.running_count = running_count
+        if counter is not None:
+            self.counter.restore(counter)
+
     def get_true_count(self):
-        decks_remaining = len(self.cards) / 52.0
-        if decks_remaining == 0:
-            return 0
-        return self.running_count / decks_remaining
+        return true_count(self.running_count, len(self.buffer) - self.pos, self.true_count_method)
@@ -0,0 +1,239 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from basic_strategy import computed_chart
+from blackjack import BlackjackGame
+from counting import CardCounter, TRUE_COUNT_METHODS
+from history import HandHistoryWriter
+from rng import ShuffleStream
+from shoe import ArrayShoe
+from stats import CountStats
+from strategy import best_move, DEFAULT_DEVIATION_SET
+
+
+class SimulationResult(CountStats):
+    """Streaming totals for a simulation run, see stats.CountStats. Results
+    are in units of the flat bet. seed is the shoe's shuffle seed, which
+    replays the run."""
+    __slots__ = ('seed',)
+
+    def __init__(self, seed=None):
+        super().__init__()
+        self.seed = seed
+
+
+def play_round(game, bet, use_deviations=True, deviation_set=None, chart=None):
+    """Play one round on `game` the way the trainer would and return the net win."""
+    balance = game.balance
+    game.start_round(bet)
+    if game.in_progress:
+        play_hands(game, use_deviations, deviation_set, chart)
+        game.play_dealer()
+        game.settle_bets()
+    return game.balance - balance
+
+
+def play_hands(game, use_deviations=True, deviation_set=None, chart=None):
+    """
+    Play out the player's hands of the round in progress with the trainer's
+    strategy. chart: name of a strategy.CHARTS chart set, default the
+    hand-typed one.
+    """
+    shoe = game.shoe
+    dealer_card = game.dealer_hand[0]
+    while not game.all_player_hands_finished():
+        hand = game.get_current_hand()
+        can_double = game.can_double(hand)
+        can_split = game.can_split(hand)
+        can_surrender = game.can_surrender(hand)
+        true_count = shoe.get_true_count() if use_deviations else None
+        move, _ = best_move(hand.cards, dealer_card, true_count, can_double=can_double,
+                            can_split=can_split, can_surrender=can_surrender,
+                            deviation_set=deviation_set, chart=chart)
+
+        if move == "Hit":
+            game.player_hit()
+        elif move == "Double":
+            game.player_double()
+        elif move == "Split":
+            game.player_split()
+        elif move == "Surrender":
+            game.player_surrender()
+        else:
+            game.player_stand()
+        if game.get_current_hand().finished:
+            game.advance_hand()
+
+
+def simulate(rounds, num_decks=8, reshuffle_pct=0.8, bet=10, use_deviations=True, game=None, rules=None,
+             deviation_set=None, history=None, seed=None, chart=None):
+    """
+    Play `rounds` rounds headless with the trainer's strategy and return a
+    SimulationResult, fed by the game's settle path. Bets are flat, results
+    are reported in bets.
+    chart: chart set name, see play_hands
+    history: optional history.HandHistoryWriter to record every round to
+    seed: shuffle seed or rng.ShuffleStream, None for a fresh one
+    """
+    if game is None:
+        game = BlackjackGame(starting_balance=10 ** 15, min_bet=bet, max_bet=bet,
+                             shoe=ArrayShoe(num_decks, reshuffle_pct, rng=seed), rules=rules, history=history)
+    rng = getattr(game.shoe, "rng", None)
+    result = SimulationResult(rng.seed if rng is not None else None)
+    stats, game.stats = game.stats, result
+    for _ in range(rounds):
+        play_round(game, bet, use_deviations, deviation_set, chart)
+    game.stats = stats
+    return result
+
+
+def _simulate_part(task):
+    rounds, stream, kwargs = task
+    return simulate(rounds, seed=stream, **kwargs)
+
+
+def simulate_parallel(rounds, parts=None, workers=None, seed=None, **kwargs):
+    """
+    simulate() split into `parts` runs (default one per worker) across a
+    process pool and merged. Every part shuffles from its own stream spawned
+    from `seed`, so the result depends on the seed and the parts, never on
+    the worker count. kwargs are as for simulate, except game and history.
+    """
+    stream = ShuffleStream(seed)
+    parts = parts or workers or os.cpu_count()
+    sizes = [rounds // parts + (i < rounds % parts) for i in range(parts)]
+    tasks = [(size, part, kwargs) for size, part in zip(sizes, stream.spawn(parts))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_simulate_part, tasks))
+    result = SimulationResult(stream.seed)
+    for part in results:
+        result.merge(part)
+    return result
+
+
+def outcomes_by_true_count(rounds, num_decks=8, reshuffle_pct=0.8, bet=10, use_deviations=True,
+                           rules=None, min_tc=-5, max_tc=10, deviation_set=None, system="Hi-Lo",
+                           method="exact", seed=None):
+    """
+    Play `rounds` flat-bet rounds and tally net results (in bets) by the
+    true count, floored and clamped to [min_tc, max_tc], when the bet was placed.
+    system and method pick the counting system and true count conversion the
+    rounds are bucketed by; playing deviations always use Hi-Lo.
+    Returns {true count: {net result: rounds}}.
+    """
+    counter = CardCounter([system], num_decks, method) if system != "Hi-Lo" else None
+    game = BlackjackGame(starting_balance=10 ** 15, min_bet=bet, max_bet=bet, rules=rules,
+                         shoe=ArrayShoe(num_decks, reshuffle_pct, counter=counter, true_count_method=method,
+                                        rng=seed))
+    shoe = game.shoe
+    tallies = {}
+    for _ in range(rounds):
+        if shoe.needs_reshuffle():
+            shoe.reshuffle()
+        if counter is None:
+            true_count = shoe.get_true_count()
+        else:
+            true_count = counter.true_count(shoe.cards_left(), system)
+        true_count = min(max(math.floor(true_count), min_tc), max_tc)
+        net = play_round(game, bet, use_deviations, deviation_set) / bet
+        counts = tallies.setdefault(true_count, {})
+        counts[net] = counts.get(net, 0) + 1
+    return tallies
+
+
+def compare_systems(rounds, systems=None, num_decks=8, reshuffle_pct=0.8, bet=10, rules=None,
+                    method="exact", seed=None):
+    """
+    Play `rounds` flat-bet rounds once while counting every system in
+    `systems` (default all of counting.SYSTEMS) and return {system:
+    correlation between the true count when the bet was placed and the
+    round's result}. Higher means the count predicts the next round better.
+    """
+    counter = CardCounter(systems, num_decks, method)
+    game = BlackjackGame(starting_balance=10 ** 15, min_bet=bet, max_bet=bet,
+                         shoe=ArrayShoe(num_decks, reshuffle_pct, counter=counter, rng=seed), rules=rules)
+    shoe = game.shoe
+    n = len(counter.systems)
+    sum_tc, sum_tc_sq, sum_tc_net = [0.0] * n, [0.0] * n, [0.0] * n
+    sum_net = sum_net_sq = 0.0
+    for _ in range(rounds):
+        if shoe.needs_reshuffle():
+            shoe.reshuffle()
+        tcs = counter.true_counts(shoe.cards_left()).values()
+        net = play_round(game, bet) / bet
+        sum_net += net
+        sum_net_sq += net * net
+        for i, tc in enumerate(tcs):
+            sum_tc[i] += tc
+            sum_tc_sq[i] += tc * tc
+            sum_tc_net[i] += tc * net
+
+    var_net = sum_net_sq / rounds - (sum_net / rounds) ** 2
+    correlations = {}
+    for i, name in enumerate(counter.systems):
+        mean_tc = sum_tc[i] / rounds
+        cov = sum_tc_net[i] / rounds - mean_tc * sum_net / rounds
+        var_tc = sum_tc_sq[i] / rounds - mean_tc * mean_tc
+        correlations[name] = cov / math.sqrt(var_tc * var_net) if var_tc > 0 and var_net > 0 else 0.0
+    return correlations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless blackjack simulation")
+    parser.add_argument("rounds", type=int, nargs="?", default=100000)
+    parser.add_argument("--decks", type=int, default=8)
+    parser.add_argument("--penetration", type=float, default=0.8)
+    parser.add_argument("--no-deviations", action="store_true")
+    parser.add_argument("--deviation-set", default=None, help=f"default: {DEFAULT_DEVIATION_SET}")
+    parser.add_argument("--surrender", action="store_true", help="offer late surrender")
+    parser.add_argument("--computed-chart", action="store_true",
+                        help="play basic strategy computed for these rules instead of the hand-typed chart")
+    parser.add_argument("--compare-systems", action="store_true",
+                        help="report how well each counting system's true count predicts results instead")
+    parser.add_argument("--true-count", default="exact", choices=sorted(TRUE_COUNT_METHODS),
+                        help="deck estimation for true counts")
+    parser.add_argument("--history", default=None, help="append every round to this hand history file")
+    parser.add_argument("--seed", type=int, default=None, help="shuffle seed; the same seed replays the run")
+    parser.add_argument("--parts", type=int, default=None,
+                        help="split the run into this many parts over a process pool and merge the results")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --parts; default one per core")
+    parser.add_argument("--by-count", action="store_true", help="also report EV by true count at the bet")
+    args = parser.parse_args()
+    if args.parts and args.history:
+        parser.error("--history can't be written from several processes")
+
+    if args.compare_systems:
+        start = time.perf_counter()
+        correlations = compare_systems(args.rounds, num_decks=args.decks, reshuffle_pct=args.penetration,
+                                       rules={'LS': args.surrender}, method=args.true_count, seed=args.seed)
+        print(f"Rounds: {args.rounds}  ({time.perf_counter() - start:.1f}s)")
+        for name, correlation in sorted(correlations.items(), key=lambda item: -item[1]):
+            print(f"{name:<12} true count / result correlation {correlation:+.4f}")
+        raise SystemExit
+
+    rules = {'LS': args.surrender}
+    chart = computed_chart(rules, args.decks) if args.computed_chart else None
+    history = HandHistoryWriter(args.history) if args.history else None
+    start = time.perf_counter()
+    if args.parts:
+        result = simulate_parallel(args.rounds, args.parts, args.workers, args.seed, num_decks=args.decks,
+                                   reshuffle_pct=args.penetration, use_deviations=not args.no_deviations,
+                                   rules=rules, deviation_set=args.deviation_set, chart=chart)
+    else:
+        result = simulate(args.rounds, num_decks=args.decks, reshuffle_pct=args.penetration,
+                          use_deviations=not args.no_deviations, rules=rules,
+                          deviation_set=args.deviation_set, history=history, seed=args.seed, chart=chart)
+    if history is not None:
+        history.close()
+    elapsed = time.perf_counter() - start
+    print(f"Rounds: {result.rounds}  ({result.rounds / elapsed * 60:,.0f} rounds/min)  Seed: {result.seed}")
+    print(f"Win rate: {result.win_rate():.2%}  Loss rate: {result.loss_rate():.2%}  "
+          f"Push rate: {result.push_rate():.2%}")
+    print(f"EV per hand: {result.ev():+.4%}  SD per hand: {result.stddev():.4f}")
+    print(f"DI: {result.di():+.2f}  SCORE: {result.score():+.2f}  N0: {result.n0():,.0f} rounds")
+    if args.by_count:
+        for true_count, (rounds, ev) in result.ev_by_count().items():
+            print(f"TC {true_count:+3d}: {rounds:>10,} rounds  EV {ev:+.4%}")
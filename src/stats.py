@@ -0,0 +1,117 @@
+"""
+Streaming statistics for simulated rounds, in constant memory.
+
+Means and variances are kept with Welford updates rather than raw sums of
+squares, so billions of rounds don't lose precision, and two accumulators
+merge exactly (Chan et al.), so runs split over worker processes combine
+into the same result as one long run. Results are in betting units.
+"""
+import math
+
+
+class RunningStats:
+    """Mean, variance and win/loss/push counts of a stream of round results."""
+    __slots__ = ('rounds', 'mean', 'm2', 'wins', 'losses', 'pushes')
+
+    def __init__(self):
+        self.rounds = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+
+    def add(self, net):
+        self.rounds += 1
+        delta = net - self.mean
+        self.mean += delta / self.rounds
+        self.m2 += delta * (net - self.mean)
+        if net > 0:
+            self.wins += 1
+        elif net < 0:
+            self.losses += 1
+        else:
+            self.pushes += 1
+
+    def merge(self, other):
+        """Fold in another accumulator's rounds. Returns self."""
+        if not other.rounds:
+            return self
+        rounds = self.rounds + other.rounds
+        delta = other.mean - self.mean
+        self.mean += delta * other.rounds / rounds
+        self.m2 += other.m2 + delta * delta * self.rounds * other.rounds / rounds
+        self.rounds = rounds
+        self.wins += other.wins
+        self.losses += other.losses
+        self.pushes += other.pushes
+        return self
+
+    def win_rate(self):
+        return self.wins / self.rounds if self.rounds else 0.0
+
+    def loss_rate(self):
+        return self.losses / self.rounds if self.rounds else 0.0
+
+    def push_rate(self):
+        return self.pushes / self.rounds if self.rounds else 0.0
+
+    def ev(self):
+        """Expected value per round."""
+        return self.mean
+
+    def variance(self):
+        return self.m2 / (self.rounds - 1) if self.rounds > 1 else 0.0
+
+    def stddev(self):
+        return math.sqrt(self.variance())
+
+    def di(self):
+        """Desirability index: 1000 x EV / SD per round."""
+        sd = self.stddev()
+        return 1000.0 * self.mean / sd if sd else 0.0
+
+    def score(self):
+        """
+        SCORE: win rate per 100 rounds for a 10,000 unit bankroll, betting
+        in proportion to it. Equal to DI squared, signed like the EV.
+        """
+        di = self.di()
+        return math.copysign(di * di, di)
+
+    def n0(self):
+        """Rounds until the expected win equals one standard deviation: (SD / EV) ^ 2."""
+        return (self.stddev() / self.mean) ** 2 if self.mean else math.inf
+
+
+class CountStats(RunningStats):
+    """
+    RunningStats overall and per true count, floored and clamped to
+    [min_tc, max_tc], when the round's bet was placed.
+    """
+    __slots__ = ('min_tc', 'max_tc', 'by_count')
+
+    def __init__(self, min_tc=-5, max_tc=10):
+        super().__init__()
+        self.min_tc = min_tc
+        self.max_tc = max_tc
+        self.by_count = {}
+
+    def add(self, net, true_count=None):
+        RunningStats.add(self, net)
+        if true_count is not None:
+            bucket = min(max(math.floor(true_count), self.min_tc), self.max_tc)
+            stats = self.by_count.get(bucket)
+            if stats is None:
+                stats = self.by_count[bucket] = RunningStats()
+            stats.add(net)
+
+    def merge(self, other):
+        RunningStats.merge(self, other)
+        for bucket, stats in getattr(other, "by_count", {}).items():
+            self.by_count.setdefault(bucket, RunningStats()).merge(stats)
+        return self
+
+    def ev_by_count(self):
+        """{true count: (rounds, EV per round)}."""
+        return {bucket: (stats.rounds, stats.mean) for bucket, stats in sorted(self.by_count.items())}
@@ -1,4 +1,7 @@
 # strategy.py
+import json
+import math
+import os
 
 def card_str_to_int(card):
     rank = card[0]
@@ -17,35 +20,395 @@ def hand_to_int_list(hand):
     return [card_str_to_int(card) for card in hand]
 
 
+# ------------- CHARTS -------------
+# Columns: dealer upcard 2-10, then Ace
+
+# Hard totals 9-16. Hard 17+ always stands, 8 and below always hits.
+HARD_CHART = {
+    16: ["S","S","S","S","S","H","H","H","H","H"],
+    15: ["S","S","S","S","S","H","H","H","H","H"],
+    14: ["S","S","S","S","S","H","H","H","H","H"],
+    13: ["S","S","S","S","S","H","H","H","H","H"],
+    12: ["H","H","S","S","S","H","H","H","H","H"],
+    11: ["D"] * 10,
+    10: ["D","D","D","D","D","D","D","D","H","H"],
+    9:  ["H","D","D","D","D","H","H","H","H","H"],
+}
+
+# Soft totals 13-20
+SOFT_CHART = {
+    20: ["S"]*10,                                        # A,9
+    19: ["S","S","S","S","Ds","S","S","S","S","S"],     # A,8 (Ds vs 6)
+    18: ["Ds","Ds","Ds","Ds","Ds","S","S","H","H","H"], # A,7
+    17: ["H","D","D","D","D","H","H","H","H","H"],      # A,6
+    16: ["H","H","D","D","D","H","H","H","H","H"],      # A,5
+    15: ["H","H","D","D","D","H","H","H","H","H"],      # A,4
+    14: ["H","H","H","D","D","H","H","H","H","H"],      # A,3
+    13: ["H","H","H","D","D","H","H","H","H","H"],      # A,2
+}
+
+# Pairs by card value (Ace=1). True = split.
+Y, N = True, False
+SPLIT_CHART = {
+    1:  [Y,Y,Y,Y,Y,Y,Y,Y,Y,Y],
+    2:  [Y,Y,Y,Y,Y,Y,N,N,N,N],
+    3:  [Y,Y,Y,Y,Y,Y,N,N,N,N],
+    4:  [N,N,N,Y,Y,N,N,N,N,N],
+    5:  [N,N,N,N,N,N,N,N,N,N],
+    6:  [Y,Y,Y,Y,Y,N,N,N,N,N],
+    7:  [Y,Y,Y,Y,Y,Y,N,N,N,N],
+    8:  [Y,Y,Y,Y,Y,Y,Y,Y,Y,Y],
+    9:  [Y,Y,Y,Y,Y,N,Y,Y,N,N],
+    10: [N,N,N,N,N,N,N,N,N,N],
+}
+
+# Late surrender, hard totals (H17 chart)
+SURRENDER_CHART = {
+    17: [N,N,N,N,N,N,N,N,N,Y],
+    16: [N,N,N,N,N,N,N,Y,Y,Y],
+    15: [N,N,N,N,N,N,N,N,Y,Y],
+}
+del Y, N
+
+# Chart sets by name: (hard, soft, split, surrender) charts in the formats
+# above. The hand-typed charts are the default; basic_strategy.py registers
+# charts computed for other rule sets.
+DEFAULT_CHART = "Chart"
+CHARTS = {DEFAULT_CHART: (HARD_CHART, SOFT_CHART, SPLIT_CHART, SURRENDER_CHART)}
+
+
+def register_chart(name, hard, soft, split, surrender):
+    """Add or replace a chart set. Hard totals missing from `hard` stand on 17+ and hit below."""
+    CHARTS[name] = (hard, soft, split, surrender)
+    for key in [key for key in _COMPILED if key[1] == name]:
+        del _COMPILED[key]
+
+
+def chart_names():
+    return sorted(CHARTS)
+
+# ------------- COMPILED TABLE -------------
+# Every answer above depends only on the hand state, its total (aces as 1),
+# the dealer upcard and the true count, so they are all precomputed into one
+# flat table per deviation set and each call is a single index lookup.
+HARD, SOFT, PAIR = 0, 1, 2
+NUM_TOTALS = 32
+
+_CARD_VALUES = {'A': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
+                'T': 10, 'J': 10, 'Q': 10, 'K': 10}
+
+
+def _chart_idx(upcard):
+    return upcard - 2 if upcard != 1 else 9
+
+
+# ------------- VARIANCE PLAYS -------------
+# Deviation sets are JSON files in data/deviations. Each rule is
+# [hand, dealer upcard ("A" for Ace), TC threshold, action, direction (">=" or "<=")]
+# where hand is a hard total (aces as 1), "pairN" for a pair of N ("pairA" for
+# aces, "pair10" for any two ten-valued cards) or "insurance".
+# Earlier rules win, and a set's "include" list is read before its own rules.
+DEVIATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "deviations")
+DEFAULT_DEVIATION_SET = "Trainer"
+
+_ALLOWED = {"Double": 2, "Split": 1, "Surrender": 4}
+
+
+def _card_value(value, rule):
+    """Value (Ace=1) of a card written as "A", "T", "7", 7 or 10 in a file rule."""
+    if isinstance(value, str) and value in _CARD_VALUES:
+        return _CARD_VALUES[value]
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+    if number == 11:
+        return 1
+    if not 1 <= number <= 10:
+        raise ValueError(f"Bad card {value!r} in deviation {rule}")
+    return number
+
+
+def _parse_rule(rule):
+    """File rule -> ((state, total) or "insurance", upcard with Ace as 1, tc, move, sense)."""
+    hand, upcard, true_count, move, sense = rule
+    if sense not in (">=", "<="):
+        raise ValueError(f"Bad direction in deviation {rule}")
+    # Counts are bucketed by half steps around whole numbers, see compile_table
+    if isinstance(true_count, bool) or not isinstance(true_count, (int, float)) or true_count != int(true_count):
+        raise ValueError(f"Deviation thresholds must be whole true counts: {rule}")
+    true_count = int(true_count)
+    upcard = _card_value(upcard, rule)
+    if hand == "insurance":
+        key = hand
+    elif isinstance(hand, str) and hand.startswith("pair"):
+        key = (PAIR, 2 * _card_value(hand[4:], rule))
+    else:
+        try:
+            key = (HARD, int(hand))
+        except (TypeError, ValueError):
+            raise ValueError(f"Bad hand {hand!r} in deviation {rule}") from None
+    return key, upcard, true_count, move, sense
+
+
+def load_deviation_sets(directory=DEVIATIONS_DIR):
+    """
+    Read every deviation set in `directory`.
+    Returns {name: {"system", "description", "rules", "insurance"}} with
+    "rules" the parsed playing rules in priority order and "insurance" the
+    insurance rules.
+    """
+    raw = {}
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".json"):
+                with open(os.path.join(directory, filename)) as f:
+                    data = json.load(f)
+                raw[data["name"]] = data
+
+    def rules_for(name, seen=()):
+        if name in seen:
+            raise ValueError(f"Deviation set {name!r} includes itself")
+        data = raw[name]
+        rules = []
+        for included in data.get("include", []):
+            rules.extend(rules_for(included, seen + (name,)))
+        rules.extend(_parse_rule(rule) for rule in data.get("deviations", []))
+        return rules
+
+    sets = {}
+    for name, data in raw.items():
+        rules = rules_for(name)
+        sets[name] = {
+            "system": data.get("system", "Hi-Lo"),
+            "description": data.get("description", ""),
+            "rules": [r for r in rules if r[0] != "insurance"],
+            "insurance": [r for r in rules if r[0] == "insurance"],
+        }
+    return sets
+
+
+DEVIATION_SETS = load_deviation_sets()
+DEVIATIONS = DEVIATION_SETS.get(DEFAULT_DEVIATION_SET, {"rules": []})["rules"]
+
+
+def register_deviation_set(name, rules, system="Hi-Lo", description=""):
+    """Add or replace a deviation set from rules in the file format."""
+    parsed = [_parse_rule(rule) for rule in rules]
+    DEVIATION_SETS[name] = {
+        "system": system,
+        "description": description,
+        "rules": [r for r in parsed if r[0] != "insurance"],
+        "insurance": [r for r in parsed if r[0] == "insurance"],
+    }
+    for key in [key for key in _COMPILED if key[0] == name]:
+        del _COMPILED[key]
+
+
+def deviation_set_names():
+    return sorted(DEVIATION_SETS)
+
+
+def _allowed(move, flags):
+    mask = _ALLOWED.get(move)
+    return mask is None or flags & mask
+
+
+def _matches(rule, true_count):
+    req_tc, sense = rule[2], rule[4]
+    return true_count >= req_tc if sense == ">=" else true_count <= req_tc
+
+
+def _chart_move(state, total, upcard, charts):
+    """What the old chart functions return for this state: best_move_hard,
+    best_move_soft, or should_split."""
+    hard_chart, soft_chart, split_chart, _ = charts
+    idx = _chart_idx(upcard)
+    if state == PAIR:
+        return split_chart.get(total // 2, [False] * 10)[idx]
+    if state == SOFT:
+        row = soft_chart.get(total + 10)
+        return row[idx] if row else None
+    row = hard_chart.get(total)
+    if row is None:
+        return "S" if total >= 17 else "H"
+    return row[idx]
+
+
+def _decide(state, total, upcard, can_double, can_split, can_surrender, charts):
+    """Chart decision (move, False) for a hand state, deviations aside."""
+    surrender_chart = charts[3]
+    move = None
+    if can_split and state == PAIR and _chart_move(PAIR, total, upcard, charts):
+        move = "Split"
+
+    is_soft = state == SOFT or (state == PAIR and total == 2)
+    val = total + 10 if is_soft else total
+    if move is None and can_surrender and not is_soft and total in surrender_chart:
+        if surrender_chart[total][_chart_idx(upcard)]:
+            move = "Surrender"
+    if move is None:
+        if is_soft and val != 21:
+            best = _chart_move(SOFT, total, upcard, charts)
+            if best == "S":
+                move = "Stand"
+            elif best == "H":
+                move = "Hit"
+            elif best == "D" or best == "Ds":
+                if can_double:
+                    move = "Double"
+                else:
+                    move = "Hit" if best == "D" else "Stand"
+        elif not is_soft:
+            best = _chart_move(HARD, total, upcard, charts)
+            if best == "S":
+                move = "Stand"
+            elif best == "H":
+                move = "Hit"
+            elif best == "D" or best == "Ds":
+                if can_double:
+                    move = "Double"
+                else:
+                    move = "Hit" if best == "D" else "Stand"
+    if move is None:
+        move = "Stand" if val >= 17 else "Hit"
+    return move, False
+
+
+def _cell_rules(rules, state, total, upcard):
+    """Rules that can apply to a hand state: pair rules for pairs, then hard
+    totals for hard hands and unsplit pairs. Soft hands have no total rules."""
+    pair_rules = [r for r in rules if r[0] == (PAIR, total) and r[1] == upcard] if state == PAIR else []
+    total_rules = []
+    if state != SOFT and not (state == PAIR and total == 2):
+        total_rules = [r for r in rules if r[0] == (HARD, total) and r[1] == upcard]
+    return pair_rules, total_rules
+
+
+def compile_table(rules, charts=None):
+    """
+    Build the flat decision table for a list of parsed playing rules over a
+    chart set from CHARTS, default the hand-typed charts.
+    Each cell is (chart move, deviation move, best moves) where best moves is
+    indexed by can_surrender * 4 + can_double * 2 + can_split. A deviation
+    only counts for a flag combination that allows its move, otherwise the
+    next matching rule or the chart applies.
+    Bucket 0 means "no count".
+    """
+    thresholds = [rule[2] for rule in rules] or [0]
+    lo, hi = min(thresholds), max(thresholds)
+    # True counts are bucketed as 2*floor(tc), +1 if tc is not a whole number,
+    # so both ">=" and "<=" against whole-number thresholds stay exact.
+    lo_bucket, hi_bucket = 2 * lo - 1, 2 * hi + 1
+    num_buckets = hi_bucket - lo_bucket + 2
+    bucket_counts = [None] + [b // 2 + (0.5 if b % 2 else 0) for b in range(lo_bucket, hi_bucket + 1)]
+
+    charts = charts or CHARTS[DEFAULT_CHART]
+    table = []
+    for state in (HARD, SOFT, PAIR):
+        for total in range(NUM_TOTALS):
+            for upcard in range(1, 11):
+                chart = _chart_move(state, total, upcard, charts)
+                base = tuple(_decide(state, total, upcard, flags >> 1 & 1, flags & 1, flags >> 2, charts)
+                             for flags in range(8))
+                pair_rules, total_rules = _cell_rules(rules, state, total, upcard)
+                if not pair_rules and not total_rules:
+                    table.extend([(chart, None, base)] * num_buckets)
+                    continue
+                # A pair that is going to be split ignores the hard total rules
+                candidates = [pair_rules if base[flags][0] == "Split" else pair_rules + total_rules
+                              for flags in range(8)]
+                for true_count in bucket_counts:
+                    if true_count is None:
+                        table.append((chart, None, base))
+                        continue
+                    deviation = next((r[3] for r in pair_rules + total_rules if _matches(r, true_count)), None)
+                    moves = []
+                    for flags in range(8):
+                        move = next((r[3] for r in candidates[flags] if _matches(r, true_count)
+                                     and _allowed(r[3], flags)), None)
+                        moves.append((move, True) if move else base[flags])
+                    table.append((chart, deviation, tuple(moves)))
+    return table, lo_bucket, hi_bucket, num_buckets
+
+
+_COMPILED = {}
+
+
+def compiled(deviation_set=None, chart=None):
+    """(table, lo bucket, hi bucket, buckets) for a deviation set over a chart set, compiled on first use."""
+    key = (deviation_set or DEFAULT_DEVIATION_SET, chart or DEFAULT_CHART)
+    entry = _COMPILED.get(key)
+    if entry is None:
+        if key[0] not in DEVIATION_SETS:
+            raise KeyError(f"Unknown deviation set {key[0]!r}")
+        if key[1] not in CHARTS:
+            raise KeyError(f"Unknown chart {key[1]!r}")
+        entry = _COMPILED[key] = compile_table(DEVIATION_SETS[key[0]]["rules"], CHARTS[key[1]])
+    return entry
+
+
+_TABLE, _LO_BUCKET, _HI_BUCKET, _NUM_BUCKETS = _COMPILED[DEFAULT_DEVIATION_SET, DEFAULT_CHART] = \
+    compile_table(DEVIATIONS)
+
+
+# Card code or first character or int upcard -> value, ace as 1
+_VALUE = dict(_CARD_VALUES)
+_VALUE.update({rank + suit: value for rank, value in _CARD_VALUES.items() for suit in 'HDCS'})
+_UPCARD = dict(_VALUE)
+_UPCARD.update({value: value for value in range(1, 11)})
+_UPCARD[11] = 1
+
+
+def _bucket(true_count, lo_bucket, hi_bucket):
+    if true_count is None:
+        return 0
+    floor = math.floor(true_count)
+    b = 2 * floor + (true_count != floor)
+    if b < lo_bucket:
+        b = lo_bucket
+    elif b > hi_bucket:
+        b = hi_bucket
+    return b - lo_bucket + 1
+
+
+def hand_state(hand):
+    """Returns (state, total) for a hand of card codes or ints, total counting aces as 1."""
+    if hand and hand[0].__class__ is str:
+        values = [_VALUE[card] for card in hand]
+    else:
+        values = hand
+    total = sum(values)
+    if len(values) == 2 and values[0] == values[1]:
+        return PAIR, total
+    if total > 11:
+        return HARD, min(total, NUM_TOTALS - 1)
+    return (SOFT if 1 in values else HARD), total
+
+
+def lookup(state, total, dealer_upcard, true_count=None, deviation_set=None, chart=None):
+    """Table cell for a hand state: (chart move, deviation move, best moves)."""
+    if (deviation_set is None or deviation_set == DEFAULT_DEVIATION_SET) and (chart is None or chart == DEFAULT_CHART):
+        table, lo_bucket, hi_bucket, num_buckets = _TABLE, _LO_BUCKET, _HI_BUCKET, _NUM_BUCKETS
+    else:
+        table, lo_bucket, hi_bucket, num_buckets = compiled(deviation_set, chart)
+    return table[((state * NUM_TOTALS + total) * 10 + _UPCARD[dealer_upcard] - 1) * num_buckets
+                 + _bucket(true_count, lo_bucket, hi_bucket)]
+
+
+def should_take_insurance(true_count, deviation_set=None):
+    """True if the deviation set takes insurance against an Ace at this true count."""
+    if true_count is None:
+        return False
+    rules = DEVIATION_SETS[deviation_set or DEFAULT_DEVIATION_SET]["insurance"]
+    return any(rule[1] == 1 and _matches(rule, true_count) for rule in rules)
+
+
 def should_split(hand, dealer_upcard):
     """hand: list of card codes or ints (pair)
        dealer_upcard: int (1 or 11 for Ace, 2-10, or card code string like 'AS')"""
     values = hand_to_int_list(hand)
-    if isinstance(dealer_upcard, str):
-        dealer_upcard = card_str_to_int(dealer_upcard)
-    pair_value = values[0]  # since both cards are same value
-    if dealer_upcard == 1:
-        dealer_upcard = 11
-    if pair_value == 1:
-        return True
-    elif pair_value in [2, 3]:
-        return 2 <= dealer_upcard <= 7
-    elif pair_value == 4:
-        return dealer_upcard == 5 or dealer_upcard == 6
-    elif pair_value == 5:
-        return False
-    elif pair_value == 6:
-        return 2 <= dealer_upcard <= 6
-    elif pair_value == 7:
-        return dealer_upcard <= 7
-    elif pair_value == 8:
-        return True
-    elif pair_value == 9:
-        return dealer_upcard <= 6 or dealer_upcard in [8, 9]
-    elif pair_value == 10:
-        return False
-    else:
-        return False
+    return lookup(PAIR, 2 * values[0], dealer_upcard)[0]
 
 def should_double_down(hand, dealer_upcard):
     """hand: list of card codes or ints (Ace=1, 2-10)
@@ -89,34 +452,12 @@ def best_move_soft(hand, dealer_upcard):
     dealer_upcard: int or card code string
     Returns: 'H', 'S', 'D', or 'Ds'
     """
-    values = hand_to_int_list(hand)
-    if isinstance(dealer_upcard, str):
-        dealer_upcard = card_str_to_int(dealer_upcard)
-    if dealer_upcard == 1:
-        dealer_upcard = 11
-    total = sum(values)
-    aces = values.count(1)
-    soft = (aces > 0 and total + 10 <= 21)
-    value = total + 10 if soft else total
-
-    if not soft or value < 13 or value > 20:
+    state, total = hand_state(hand)
+    if state == PAIR:
+        state = SOFT if total == 2 else HARD
+    if state != SOFT:
         return None
-
-    chart = {
-        20: ["S"]*10,                                        # A,9
-        19: ["S","S","S","S","Ds","S","S","S","S","S"],     # A,8 (Ds vs 6)
-        18: ["Ds","Ds","Ds","Ds","Ds","S","S","H","H","H"], # A,7
-        17: ["H","D","D","D","D","H","H","H","H","H"],      # A,6
-        16: ["H","H","D","D","D","H","H","H","H","H"],      # A,5
-        15: ["H","H","D","D","D","H","H","H","H","H"],      # A,4
-        14: ["H","H","H","D","D","H","H","H","H","H"],      # A,3
-        13: ["H","H","H","D","D","H","H","H","H","H"],      # A,2
-    }
-
-    idx = dealer_upcard - 2 if dealer_upcard != 11 else 9
-
-    move = chart[value][idx]
-    return move
+    return lookup(SOFT, total, dealer_upcard)[0]
 
 def best_move_hard(hand, dealer_upcard):
     """
@@ -127,102 +468,50 @@ def best_move_hard(hand, dealer_upcard):
         'S' - Stand
         'D' - Double if allowed, otherwise hit
     """
-    values = hand_to_int_list(hand)
-    if isinstance(dealer_upcard, str):
-        dealer_upcard = card_str_to_int(dealer_upcard)
-
-    if dealer_upcard == 1:
-        dealer_upcard = 11
-    total = sum(values)
-    # Only apply this for hard hands (not soft hands)
-    if 1 in values and total + 10 <= 21:
+    state, total = hand_state(hand)
+    if state == SOFT or (state == PAIR and total == 2):
         return None
+    return lookup(HARD, total, dealer_upcard)[0]
 
-    # Hard total strategy chart, based on your image.
-    # Rows: player hard total (17-8), Columns: dealer upcard (2-11)
-    chart = {
-        17: ["S"] * 10,
-        16: ["S","S","S","S","S","H","H","H","H","H"],
-        15: ["S","S","S","S","S","H","H","H","H","H"],
-        14: ["S","S","S","S","S","H","H","H","H","H"],
-        13: ["S","S","S","S","S","H","H","H","H","H"],
-        12: ["H","H","S","S","S","H","H","H","H","H"],
-        11: ["D"] * 10,
-        10: ["D","D","D","D","D","D","D","D","H","H"],
-        9:  ["H","D","D","D","D","H","H","H","H","H"],
-        8:  ["H"] * 10,
-    }
+def check_playing_deviations(hand, dealer_upcard, true_count, deviation_set=None, chart=None):
+    """
+    Given hand, dealer upcard, and true count,
+    returns one of ('Stand', 'Hit', 'Double', 'Split', 'Surrender') or None if no deviation.
+    Pair of 10s is 10, 10 or any face cards that sum to 20.
+    deviation_set: name of the index set to use, default DEFAULT_DEVIATION_SET
+    chart: name of the chart set under the deviations, default DEFAULT_CHART
+    """
+    state, total = hand_state(hand)
+    return lookup(state, total, dealer_upcard, true_count, deviation_set, chart)[1]
 
-    # For totals above 17 or below 8, use standard plays
-    if total >= 17:
-        return "S"
-    if total <= 8:
-        return "H"
 
-    # Dealer upcard 2-11 (2-10, 11=Ace)
-    idx = dealer_upcard - 2 if dealer_upcard != 11 else 9
+def best_move(hand, dealer_upcard, true_count, can_double=True, can_split=True, can_surrender=False,
+              deviation_set=None, chart=None):
+    """
+    Full trainer decision for a hand: playing deviations first, then the
+    pair, soft and hard charts.
+    hand: list of card codes
+    dealer_upcard: card code string
+    can_double: whether a double is currently affordable/allowed
+    can_split: whether another split is allowed at the table
+    can_surrender: whether late surrender is offered on this hand
+    true_count: None plays basic strategy only
+    deviation_set: name of the index set to use, default DEFAULT_DEVIATION_SET
+    chart: name of the chart set from CHARTS, default the hand-typed DEFAULT_CHART
+    Returns: (move, is_deviation) with move one of 'Hit', 'Stand', 'Double', 'Split', 'Surrender'
+    """
+    state, total = hand_state(hand)
+    flags = 4 * bool(can_surrender) + 2 * bool(can_double) + bool(can_split)
+    return lookup(state, total, dealer_upcard, true_count, deviation_set, chart)[2][flags]
 
-    # For totals 9-16, look up in chart
-    if total in chart:
-        return chart[total][idx]
 
-    # Fallback for any hand not covered (shouldn't happen)
-    return None
+# ------------- BETTING -------------
 
-def check_playing_deviations(hand, dealer_upcard, true_count):
+def ramp_bet(ramp, true_count):
     """
-    Given hand, dealer upcard, and true count,
-    returns one of ('Stand', 'Hit', 'Double', 'Split') or None if no deviation.
-    Pair of 10s is 10, 10 or any face cards that sum to 20.
+    Bet for a true count from a {true count: bet} ramp: the bet of the
+    highest count at or below it, or the lowest count's bet below the ramp.
+    Counts missing inside the ramp keep the bet below them.
     """
-    values = hand_to_int_list(hand)
-    if isinstance(dealer_upcard, str):
-        dealer_upcard = card_str_to_int(dealer_upcard)
-    total = sum(values)
-    is_pair = len(values) == 2 and values[0] == values[1]
-    # Check for Pair of 10s even if they're face cards
-    pair_of_10s = (
-        len(values) == 2 and
-        card_str_to_int(hand[0]) == 10 and
-        card_str_to_int(hand[1]) == 10
-    )
-    # ------------- VARIANCE PLAYS -------------
-    # Format: (player total or pair, dealer card, required TC, move, sense)
-    deviations = [
-        # (Player total, Dealer upcard, TC threshold, Action, Direction (">=", "<="))
-        (16, 9,   5,  "Stand",  ">="),
-        (16, 10,  0,  "Stand",  ">="),
-        (15, 10,  4,  "Stand",  ">="),
-        (13, 2,  -1,  "Stand",  ">="),
-        (13, 3,  -2,  "Stand",  ">="),
-        (12, 2,   4,  "Stand",  ">="),
-        (12, 3,   2,  "Stand",  ">="),
-        (12, 4,   0,  "Stand",  ">="),
-        (12, 5,  -1,  "Stand",  ">="),
-        (12, 6,  -1,  "Stand",  ">="),
-        (11, 11,  1,  "Double", ">="), # 11 vs Ace
-        (10, 10,  4,  "Double", ">="),
-        (10, 11,  4,  "Double", ">="),
-        (9, 2,    1,  "Double", ">="),
-        (9, 7,    4,  "Double", ">="),
-        # Pair of 10s
-        ("pair10", 5,  5, "Split", ">="),
-        ("pair10", 6,  5, "Split", ">="),
-    ]
-    for rule in deviations:
-        p_val, d_card, req_tc, move, sense = rule
-        if p_val == "pair10":
-            if not pair_of_10s:
-                continue
-            if dealer_upcard != d_card:
-                continue
-            if (sense == ">=" and true_count >= req_tc) or (sense == "<=" and true_count <= req_tc):
-                return move
-        else:
-            if total != p_val:
-                continue
-            if dealer_upcard != d_card:
-                continue
-            if (sense == ">=" and true_count >= req_tc) or (sense == "<=" and true_count <= req_tc):
-                return move
-    return None
+    keys = [k for k in sorted(ramp) if k <= true_count]
+    return ramp[keys[-1]] if keys else ramp[min(ramp)]
@@ -0,0 +1,128 @@
+"""
+A full blackjack table: up to seven seats playing against one dealer hand
+out of a shared shoe. Each seat is a BlackjackGame with its own balance,
+bet and strategy; the table deals, plays the dealer and settles.
+"""
+import argparse
+import time
+from functools import partial
+
+from blackjack import BlackjackGame, DEFAULT_RULES, play_dealer_hand
+from shoe import ArrayShoe
+from simulator import SimulationResult, play_hands
+
+MAX_SEATS = 7
+
+
+class Seat:
+    """
+    One player at the table.
+    bet: a fixed bet or a function of the true count; 0 or None sits out
+    strategy: plays out the seat's hands, called as strategy(game); the
+    default is the trainer's strategy with deviations
+    """
+    def __init__(self, game, bet=10, strategy=None):
+        self.game = game
+        self.bet = bet
+        self.strategy = strategy or partial(play_hands, use_deviations=True)
+        # Stats the game already collects into are kept
+        if game.stats is None:
+            game.stats = SimulationResult()
+        self.result = game.stats
+
+    def bet_for(self, true_count):
+        return self.bet(true_count) if callable(self.bet) else self.bet
+
+
+class BlackjackTable:
+    def __init__(self, seats=MAX_SEATS, shoe=None, rules=None, starting_balance=10000,
+                 min_bet=10, max_bet=1000):
+        if not 1 <= seats <= MAX_SEATS:
+            raise ValueError(f"A table has 1 to {MAX_SEATS} seats")
+        self.shoe = shoe if shoe is not None else ArrayShoe()
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
+        self.min_bet = min_bet
+        self.seats = [Seat(BlackjackGame(starting_balance, min_bet, max_bet, shoe=self.shoe, rules=self.rules),
+                           bet=min_bet)
+                      for _ in range(seats)]
+        self.dealer_hand = []
+        self.rounds = 0
+        self.shoes = 1
+
+    def deal(self):
+        """
+        Take bets and deal a round: one card to each playing seat, the
+        dealer's upcard, a second card to each seat, then the hole card,
+        all from one batch off the shoe. Returns the seats in the round.
+        """
+        shoe = self.shoe
+        if shoe.needs_reshuffle():
+            shoe.reshuffle()
+        counts = (shoe.get_running_count(), shoe.get_true_count())
+        playing = []
+        for seat in self.seats:
+            bet = seat.bet_for(counts[1])
+            if bet and seat.game.min_bet <= bet <= min(seat.game.max_bet, seat.game.balance):
+                playing.append((seat, bet))
+        n = len(playing)
+        if not n:
+            self.dealer_hand = []
+            return []
+        cards = shoe.deal_many(2 * n + 2)
+        self.dealer_hand = [cards[n], cards[2 * n + 1]]
+        for i, (seat, bet) in enumerate(playing):
+            seat.game.start_round(bet, [cards[i], cards[n + 1 + i]], self.dealer_hand, counts)
+        return [seat for seat, _ in playing]
+
+    def play_round(self):
+        """Deal, let every seat play in turn, play the dealer and settle. Returns the seats that played."""
+        cards_left = self.shoe.cards_left()
+        playing = self.deal()
+        if not playing:
+            return playing
+        for seat in playing:
+            if seat.game.in_progress:
+                seat.strategy(seat.game)
+        # The dealer only draws if some hand is still live
+        live = any(not (hand.is_bust() or hand.surrendered)
+                   for seat in playing if seat.game.in_progress for hand in seat.game.player_hands)
+        if live:
+            play_dealer_hand(self.dealer_hand, self.shoe, self.rules['H17'])
+        for seat in playing:
+            game = seat.game
+            if game.in_progress:
+                game.settle_bets()
+        self.rounds += 1
+        # More cards than before means the shoe was reshuffled during the round
+        if self.shoe.cards_left() > cards_left:
+            self.shoes += 1
+        return playing
+
+
+def simulate_table(rounds, seats=MAX_SEATS, num_decks=8, reshuffle_pct=0.8, bet=10, rules=None, seed=None):
+    """Play `rounds` full-table rounds with every seat flat betting. Returns the table."""
+    table = BlackjackTable(seats, ArrayShoe(num_decks, reshuffle_pct, rng=seed), rules,
+                           starting_balance=10 ** 15, min_bet=bet, max_bet=bet)
+    for _ in range(rounds):
+        table.play_round()
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless full-table blackjack simulation")
+    parser.add_argument("rounds", type=int, nargs="?", default=100000)
+    parser.add_argument("--seats", type=int, default=MAX_SEATS)
+    parser.add_argument("--decks", type=int, default=8)
+    parser.add_argument("--penetration", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = simulate_table(args.rounds, args.seats, args.decks, args.penetration, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    hands = sum(seat.result.rounds for seat in table.seats)
+    print(f"Rounds: {args.rounds}  Seats: {args.seats}  ({hands / elapsed * 60:,.0f} seat-rounds/min)")
+    print(f"Rounds per shoe: {args.rounds / table.shoes:.1f}  Seed: {table.shoe.rng.seed}")
+    for i, seat in enumerate(table.seats, 1):
+        print(f"Seat {i}: EV per hand {seat.result.ev():+.4%}  SD {seat.result.stddev():.4f}")
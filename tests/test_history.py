@@ -0,0 +1,36 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from blackjack import BlackjackGame
+from history import LOSE, RECORD_SIZE, WIN, HandHistory, HandHistoryWriter
+from shoe import ArrayShoe
+from simulator import play_round
+
+
+def test_first_round_of_a_shoe_records_the_new_shoe_count(tmp_path):
+    path = str(tmp_path / "hands.bjh")
+    with HandHistoryWriter(path) as writer:
+        game = BlackjackGame(starting_balance=10 ** 9, shoe=ArrayShoe(1, 0.5, rng=3), history=writer)
+        while not game.shoe.needs_reshuffle():
+            play_round(game, 10)
+        play_round(game, 10)
+    with HandHistory(path) as history:
+        first = history[-1]
+    assert (first.running_count, first.true_count) == (0, 0)
+
+
+def test_writer_drops_a_partial_last_record(tmp_path):
+    path = str(tmp_path / "hands.bjh")
+    with HandHistoryWriter(path) as writer:
+        writer.write(10, -10, 0, 0.0, ["TS", "7H"], [["9C", "8D"]], [LOSE], [(0, "Stand", 0, 0.0)])
+    with open(path, "ab") as f:
+        f.write(b"\0" * (RECORD_SIZE // 2))
+    with HandHistoryWriter(path) as writer:
+        writer.write(10, 10, 2, 0.5, ["TS", "6H", "9D"], [["TC", "9H"]], [WIN], [(0, "Stand", 2, 0.5)])
+    with HandHistory(path) as history:
+        assert len(history) == 2
+        assert (history[1].number, history[1].net, history[1].running_count) == (1, 10, 2)
+        assert history[1].hands == [["TC", "9H"]]
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from server import TrainerService, _reply
+
+
+@pytest.mark.parametrize("params", [
+    {"decks": 0}, {"decks": 9}, {"penetration": 0}, {"penetration": 1.5},
+    {"min_bet": 0}, {"min_bet": 50, "max_bet": 25}, {"balance": -1}, {"decks": "eight"},
+])
+def test_create_rejects_out_of_range_tables(params):
+    service = TrainerService()
+    status, reply = _reply(service.call, "create", None, params)
+    assert status == 400 and reply["error"]
+    assert not service.sessions
+
+
+def test_create_deals_from_a_valid_table():
+    service = TrainerService()
+    state = service.call("create", None, {"decks": 1, "penetration": 0.5, "seed": 1})
+    state = service.call("bet", state["session"], {"amount": 10})
+    assert state["cards_left"] == 48
@@ -0,0 +1,21 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from simulator import outcomes_by_true_count, simulate
+
+ROUNDS = 20000
+SEED = 5
+
+
+def test_simulate_buckets_like_outcomes_by_true_count():
+    # Both file a round under the true count when its bet was placed, after any reshuffle
+    result = simulate(ROUNDS, seed=SEED)
+    tallies = outcomes_by_true_count(ROUNDS, seed=SEED)
+    assert {tc: rounds for tc, (rounds, _) in result.ev_by_count().items()} == \
+        {tc: sum(counts.values()) for tc, counts in tallies.items()}
+    for tc, (rounds, ev) in result.ev_by_count().items():
+        total = sum(net * n for net, n in tallies[tc].items())
+        assert abs(ev - total / rounds) < 1e-9
@@ -0,0 +1,92 @@
+import math
+import os
+import statistics
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "src"))
+
+from blackjack import BlackjackGame
+from rng import ShuffleStream
+from shoe import ArrayShoe
+from simulator import SimulationResult, play_round, simulate, simulate_parallel
+from stats import CountStats, RunningStats
+
+
+class RecordingStats(CountStats):
+    """CountStats that also keeps every (net, true count) it is given."""
+    __slots__ = ('added',)
+
+    def __init__(self):
+        super().__init__()
+        self.added = []
+
+    def add(self, net, true_count=None):
+        self.added.append((net, true_count))
+        CountStats.add(self, net, true_count)
+
+
+def seeded_rounds(rounds=5000, seed=11):
+    """(net, true count at the bet) for every round of a seeded run, as fed by the game."""
+    stats = RecordingStats()
+    game = BlackjackGame(starting_balance=10 ** 9, shoe=ArrayShoe(6, rng=seed), stats=stats)
+    for _ in range(rounds):
+        play_round(game, 10)
+    return stats.added
+
+
+def assert_same_stats(a, b):
+    assert (a.rounds, a.wins, a.losses, a.pushes) == (b.rounds, b.wins, b.losses, b.pushes)
+    assert math.isclose(a.mean, b.mean, rel_tol=1e-9, abs_tol=1e-12)
+    assert math.isclose(a.m2, b.m2, rel_tol=1e-9)
+
+
+def test_moments_and_derived_figures():
+    nets = [1.0, -1.0, 1.5, 0.0, -2.0, 1.0, 2.0, -0.5]
+    stats = RunningStats()
+    for net in nets:
+        stats.add(net)
+    assert math.isclose(stats.ev(), statistics.mean(nets))
+    assert math.isclose(stats.variance(), statistics.variance(nets))
+    di = 1000 * stats.ev() / statistics.stdev(nets)
+    assert math.isclose(stats.di(), di)
+    assert math.isclose(stats.score(), di * di)
+    assert math.isclose(stats.n0(), (statistics.stdev(nets) / stats.ev()) ** 2)
+
+
+def test_merged_parts_equal_one_sequential_run():
+    added = seeded_rounds()
+    whole = CountStats()
+    for net, true_count in added:
+        whole.add(net, true_count)
+    merged = CountStats()
+    for start, stop in ((0, 1), (1, 1234), (1234, 1234), (1234, 4000), (4000, len(added))):
+        part = CountStats()
+        for net, true_count in added[start:stop]:
+            part.add(net, true_count)
+        merged.merge(part)
+    assert_same_stats(merged, whole)
+    assert merged.by_count.keys() == whole.by_count.keys()
+    for bucket, stats in whole.by_count.items():
+        assert_same_stats(merged.by_count[bucket], stats)
+
+
+def test_simulate_feeds_what_the_game_settles():
+    added = seeded_rounds()
+    result = simulate(len(added), num_decks=6, seed=11)
+    expected = CountStats()
+    for net, true_count in added:
+        expected.add(net, true_count)
+    assert_same_stats(result, expected)
+    assert result.ev_by_count() == expected.ev_by_count()
+
+
+def test_parallel_result_depends_on_the_parts_not_the_workers():
+    one = simulate_parallel(3001, parts=3, workers=1, seed=7)
+    two = simulate_parallel(3001, parts=3, workers=2, seed=7)
+    assert_same_stats(one, two)
+    assert one.ev_by_count() == two.ev_by_count()
+    by_hand = SimulationResult()
+    for size, stream in zip((1001, 1000, 1000), ShuffleStream(7).spawn(3)):
+        by_hand.merge(simulate(size, seed=stream))
+    assert_same_stats(one, by_hand)